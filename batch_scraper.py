@@ -0,0 +1,124 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+import numpy as np
+
+import workbook_snapshot
+
+# Default number of links scraped at the same time
+DEFAULT_MAX_WORKERS = 8
+
+# Default number of product pages downloaded at the same time from a single host
+DEFAULT_PER_HOST_LIMIT = 3
+
+# Host limiter of the batch the current worker thread belongs to
+_batch = threading.local()
+
+
+class HostLimiter:
+    """
+    Caps the number of concurrent page downloads per host with one semaphore per host.
+    """
+
+    def __init__(self, per_host_limit=DEFAULT_PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._lock = threading.Lock()
+        self._semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+
+    def for_url(self, url):
+        """
+        Get the semaphore guarding the host of the given URL.
+
+        Args:
+            url (str): Any URL.
+
+        Returns:
+            threading.BoundedSemaphore: The semaphore for the URL's host.
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            return self._semaphores[host]
+
+
+def host_slot(url):
+    """
+    Take one of the running batch's slots for the host of a URL.
+
+    Scrapes resolve their affiliate short links first, so the slot is taken
+    around the product page download and keyed by the product page's host.
+    Outside of a batch there is no cap.
+
+    Args:
+        url (str): URL about to be downloaded.
+
+    Returns:
+        context manager: Holds the slot while the block runs.
+    """
+    limiter = getattr(_batch, "limiter", None)
+    if limiter is None:
+        return nullcontext()
+    return limiter.for_url(url)
+
+
+def read_affiliate_links(file_path):
+    """
+    Read every valid affiliate link from column A of the Excel file.
+
+    Args:
+        file_path (str): Path to the Excel file.
+
+    Returns:
+        list: Affiliate links in sheet order, with invalid and blank rows dropped.
+    """
+    # Same compiled snapshot and validity bitmap as the rotation
+    with workbook_snapshot.load_snapshot(file_path, columns=1, validator="url") as snapshot:
+        return [snapshot.row(int(index))[0].strip() for index in np.flatnonzero(snapshot.valid)]
+
+
+def scrape_batch(affiliate_links, scrape_func, max_workers=DEFAULT_MAX_WORKERS,
+                 per_host_limit=DEFAULT_PER_HOST_LIMIT, **scrape_kwargs):
+    """
+    Scrape many affiliate links concurrently and yield results as they finish.
+
+    Args:
+        affiliate_links (list): Affiliate links to scrape.
+        scrape_func (callable): Function scraping a single link, e.g. get_product_details.
+        max_workers (int): Size of the thread pool.
+        per_host_limit (int): Maximum concurrent page downloads from the same host,
+            taken by scrape_func through host_slot.
+        **scrape_kwargs: Extra keyword arguments passed to scrape_func.
+
+    Yields:
+        tuple: (affiliate_link, result) where result is whatever scrape_func
+        returned, or None if it raised. Closing the generator early cancels
+        the scrapes that have not started yet.
+    """
+    limiter = HostLimiter(per_host_limit)
+
+    def scrape_one(link):
+        _batch.limiter = limiter
+        try:
+            return scrape_func(link, **scrape_kwargs)
+        finally:
+            _batch.limiter = None
+
+    # Scrape each link once even if it appears in several rows
+    unique_links = list(dict.fromkeys(affiliate_links))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+    try:
+        futures = {executor.submit(scrape_one, link): link for link in unique_links}
+        for future in as_completed(futures):
+            link = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error scraping {link} in batch: {e}")
+                result = None
+            yield link, result
+    finally:
+        # A consumer that stops early does not wait for the queued scrapes, they are cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
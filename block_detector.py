@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import threading
+
+# Amazon's "Robot Check" / captcha interstitials are small pages, real product pages are hundreds of KB
+MAX_BLOCK_PAGE_BYTES = 64 * 1024
+
+# Bytes at the start of a page searched for block markers
+BLOCK_PROBE_BYTES = 16 * 1024
+
+BLOCK_STATUS_CODES = {429, 503}
+
+BLOCK_TITLE_MARKERS = (b"robot check", b"captcha", b"sorry! something went wrong")
+BLOCK_BODY_MARKERS = (b"/errors/validatecaptcha", b"api-services-support@amazon.com", b"automated access")
+
+TITLE_PATTERN = re.compile(rb'<title[^>]*>(.*?)</title', re.IGNORECASE | re.DOTALL)
+
+# Consecutive block pages from a host before scraping it is paused
+BLOCK_THRESHOLD = int(os.environ.get("BLOCK_THRESHOLD", "2"))
+
+# Seconds a blocked host is left alone before a single trial request is let through
+BLOCK_COOLDOWN_SECONDS = float(os.environ.get("BLOCK_COOLDOWN_SECONDS", "900"))
+
+
+def detect_block_page(status_code, content):
+    """
+    Recognise a captcha or robot-check page without parsing it.
+
+    Args:
+        status_code (int): Response status code.
+        content (bytes): Raw page body, or at least its first BLOCK_PROBE_BYTES.
+
+    Returns:
+        str: Why the page looks like a block page, or None if it does not.
+    """
+    probe = content[:BLOCK_PROBE_BYTES].lower()
+
+    title = TITLE_PATTERN.search(probe)
+    if title:
+        for marker in BLOCK_TITLE_MARKERS:
+            if marker in title.group(1):
+                return f"title contains '{marker.decode()}'"
+
+    if len(content) <= MAX_BLOCK_PAGE_BYTES:
+        for marker in BLOCK_BODY_MARKERS:
+            if marker in probe:
+                return f"body contains '{marker.decode()}'"
+        if status_code in BLOCK_STATUS_CODES:
+            return f"status {status_code} with a {len(content)} byte body"
+
+    return None
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker that pauses scraping after repeated block pages.
+
+    Closed: requests flow. Open: requests are refused until the cooldown ends.
+    Half-open: one trial request is let through, its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold=BLOCK_THRESHOLD, cooldown=BLOCK_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_blocks = 0
+        self.opened_at = 0.0
+        self.blocks = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns:
+            bool: True if a request may be sent to the host.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # While half-open, a trial request is in flight; let another through if it never reported back
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.refused += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+
+    def is_paused(self):
+        """
+        Check the breaker without claiming the half-open trial request, e.g. for a redirect hop.
+
+        Returns:
+            bool: True if requests to the host are refused for now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED or time.monotonic() - self.opened_at >= self.cooldown:
+                return False
+            self.refused += 1
+            return True
+
+    def remaining_cooldown(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(self.cooldown - (time.monotonic() - self.opened_at), 0.0)
+
+    def record_block(self):
+        """
+        Returns:
+            bool: True if this block opened the breaker.
+        """
+        with self._lock:
+            self.blocks += 1
+            self.consecutive_blocks += 1
+            if self.state == self.HALF_OPEN or self.consecutive_blocks >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_blocks = 0
+
+
+_lock = threading.Lock()
+_breakers = {}
+
+
+def get_breaker(host):
+    """
+    Get the circuit breaker for a host, creating it on first use.
+
+    Args:
+        host (str): Host name, optionally with a port.
+
+    Returns:
+        CircuitBreaker: The host's breaker.
+    """
+    host = host.lower()
+    with _lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker()
+        return breaker
+
+
+def allow(host):
+    """
+    Check whether scraping a host is currently allowed, printing why not.
+
+    Args:
+        host (str): Host name, optionally with a port.
+
+    Returns:
+        bool: True if a request may be sent.
+    """
+    breaker = get_breaker(host)
+    if breaker.allow():
+        return True
+    print(f"Scraping {host} is paused for another {breaker.remaining_cooldown():.0f}s after block pages")
+    return False
+
+
+def is_paused(host):
+    """
+    Check whether a host is paused, printing why, without taking its trial request.
+
+    Args:
+        host (str): Host name, optionally with a port.
+
+    Returns:
+        bool: True if no request may be sent.
+    """
+    breaker = get_breaker(host)
+    if not breaker.is_paused():
+        return False
+    print(f"Scraping {host} is paused for another {breaker.remaining_cooldown():.0f}s after block pages")
+    return True
+
+
+def record_block(host, reason):
+    """
+    Record a block page from a host.
+
+    Args:
+        host (str): Host name, optionally with a port.
+        reason (str): Why the page was classified as a block page.
+
+    Returns:
+        bool: True if the host is now paused.
+    """
+    print(f"Block page from {host}: {reason}")
+    opened = get_breaker(host).record_block()
+    if opened:
+        print(f"Pausing scraping of {host} for {BLOCK_COOLDOWN_SECONDS:.0f}s")
+    return opened
+
+
+def record_success(host):
+    get_breaker(host).record_success()
+
+
+def stats():
+    """
+    Returns:
+        dict: host -> {"state", "blocks", "refused"}.
+    """
+    with _lock:
+        return {
+            host: {"state": breaker.state, "blocks": breaker.blocks, "refused": breaker.refused}
+            for host, breaker in _breakers.items()
+        }
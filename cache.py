@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Directory holding the persistent cache files
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
+
+# Seconds changes are collected before the cache file is rewritten, so a burst of writes costs one save
+CACHE_SAVE_DELAY_SECONDS = float(os.environ.get("CACHE_SAVE_DELAY_SECONDS", "2"))
+
+# Caches with changes not written yet are flushed when the process exits
+_caches = []
+
+
+def cache_path(filename):
+    """
+    Build the path of a cache file inside CACHE_DIR.
+
+    Args:
+        filename (str): Name of the cache file.
+
+    Returns:
+        str: Full path to the cache file.
+    """
+    return os.path.join(CACHE_DIR, filename)
+
+
+class PersistentCache:
+    """
+    A small key/value cache with per-entry TTL, LRU eviction and JSON persistence.
+
+    Values must be JSON serializable. The file is loaded lazily on first access.
+    Changes are written back at most every save_delay seconds and on exit,
+    always through a fresh temporary file, so the cache survives process
+    restarts and neither a crash mid-write nor a concurrent writer leaves a
+    truncated file behind.
+    """
+
+    def __init__(self, path, ttl, max_entries, save_delay=CACHE_SAVE_DELAY_SECONDS):
+        """
+        Args:
+            path (str): JSON file backing the cache.
+            ttl (float): Default time to live of an entry in seconds.
+            max_entries (int): Maximum number of entries before the least recently used are evicted.
+            save_delay (float): Seconds changes are collected before the file is rewritten.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self._entries = None
+        self._lock = threading.RLock()
+        # Only one save at a time, held while writing so the entries lock is not
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+        self.hits = 0
+        self.misses = 0
+        self.saves = 0
+        _caches.append(self)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding="utf-8") as f:
+                    data = json.load(f)
+                now = time.time()
+                for key, (value, expires_at) in data.items():
+                    if expires_at > now:
+                        self._entries[key] = (value, expires_at)
+        except Exception as e:
+            print(f"Error loading cache file {self.path}: {e}")
+            self._entries = OrderedDict()
+
+    def _mark_dirty(self):
+        # Called with the lock held, schedules one save for every change made within save_delay
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """
+        Write pending changes to the cache file now.
+        """
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Expired entries are dropped here instead of costing a save each
+                now = time.time()
+                entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+            self._save(entries)
+
+    def _save(self, entries):
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # A unique temporary file per save, so processes sharing the cache never write into each other's file
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.saves += 1
+        except Exception as e:
+            print(f"Error saving cache file {self.path}: {e}")
+
+    def get(self, key, default=None):
+        """
+        Get a value and mark it as recently used.
+
+        Args:
+            key (str): Cache key.
+            default: Value returned on a miss or an expired entry.
+
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entries beyond max_entries.
+
+        Args:
+            key (str): Cache key.
+            value: JSON serializable value.
+            ttl (float, optional): Time to live in seconds, defaults to the cache's ttl.
+        """
+        with self._lock:
+            self._load()
+            self._entries[key] = (value, time.time() + (ttl if ttl is not None else self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._mark_dirty()
+
+    def delete(self, key):
+        """
+        Returns:
+            bool: True if the key was cached.
+        """
+        with self._lock:
+            self._load()
+            if self._entries.pop(key, None) is not None:
+                self._mark_dirty()
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._mark_dirty()
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def stats(self):
+        """
+        Get hit and miss counters.
+
+        Returns:
+            dict: {"entries", "hits", "misses", "saves"}.
+        """
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "saves": self.saves}
+
+
+@atexit.register
+def flush_all():
+    """
+    Write the pending changes of every cache, e.g. before the process exits.
+    """
+    for persistent_cache in _caches:
+        persistent_cache.flush()
@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+from contextlib import closing
+
+# SQLite database shared by every rotation cursor and the link quarantine
+CURSOR_DB = os.environ.get("CURSOR_DB", ".cursors.db")
+
+# Seconds a writer waits for another process holding the database lock
+CURSOR_DB_TIMEOUT = 30
+
+UPSERT_CURSOR_SQL = (
+    "INSERT INTO cursors (name, position, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET position = excluded.position, updated_at = excluded.updated_at"
+)
+
+
+def connect(path=CURSOR_DB):
+    """
+    Open the shared state database in autocommit mode, transactions are started explicitly.
+
+    Args:
+        path (str): Path to the SQLite database.
+
+    Returns:
+        sqlite3.Connection: The connection, to be closed by the caller.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=CURSOR_DB_TIMEOUT, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class CursorStore:
+    """
+    Transactional round-robin cursors in SQLite.
+
+    The database runs in WAL mode and claim_next reads and advances a cursor
+    inside a single write transaction, so overlapping runs or replicas sharing
+    the file never claim the same row, and a crash can never leave a half
+    written cursor behind.
+    """
+
+    def __init__(self, path=CURSOR_DB):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self):
+        connection = connect(self.path)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                "name TEXT PRIMARY KEY, position INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._initialized = True
+        return connection
+
+    @staticmethod
+    def _legacy_position(name):
+        # Cursors used to live in plain files such as .current_link_index, pick up where they left off
+        try:
+            if os.path.exists(name):
+                with open(name, 'r') as f:
+                    return int(f.read().strip())
+        except (OSError, ValueError):
+            pass
+        return 0
+
+    def claim_next(self, name, total, select=None):
+        """
+        Atomically claim the cursor's current position and advance it.
+
+        Args:
+            name (str): Cursor name, e.g. ".current_link_index".
+            total (int): Number of rows the cursor rotates over.
+            select (callable, optional): Maps the current position to the row to
+                claim instead, e.g. the next valid one, or None if there is none.
+
+        Returns:
+            int: The claimed position in range(total), or None if select found no row.
+        """
+        with closing(self._connect()) as connection:
+            # BEGIN IMMEDIATE takes the write lock before reading, so concurrent claims are serialized
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT position FROM cursors WHERE name = ?", (name,)).fetchone()
+                position = row[0] if row else self._legacy_position(name)
+                claimed = position % total
+                if select is not None:
+                    claimed = select(claimed)
+                    if claimed is None:
+                        connection.execute("ROLLBACK")
+                        return None
+                connection.execute(UPSERT_CURSOR_SQL, (name, (claimed + 1) % total, time.time()))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def get(self, name):
+        """
+        Args:
+            name (str): Cursor name.
+
+        Returns:
+            int: The next position the cursor will claim, or None if it was never used.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT position FROM cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, name, position):
+        """
+        Move a cursor, e.g. to restart a rotation from the first row.
+
+        Args:
+            name (str): Cursor name.
+            position (int): Next position to claim.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute(UPSERT_CURSOR_SQL, (name, position, time.time()))
+
+
+cursor_store = CursorStore()
@@ -0,0 +1,351 @@
+import os
+import re
+import html
+import time
+import threading
+
+import page_parser
+import product_extractor
+
+# Precompiled byte patterns for the handful of fields we need from a product page.
+# Each one mirrors the first rule of the matching DOM selector chain.
+TITLE_OPEN_PATTERN = re.compile(rb'<span\b[^>]*\bid\s*=\s*["\']productTitle["\'][^>]*>', re.IGNORECASE)
+PRICE_OPEN_PATTERN = re.compile(
+    rb'<span\b[^>]*\bclass\s*=\s*["\'](?:[^"\']*\s)?a-price-whole(?:\s[^"\']*)?["\'][^>]*>',
+    re.IGNORECASE
+)
+PRICE_BODY_PATTERN = re.compile(
+    rb'([^<]*)'
+    rb'(?:<span\b[^>]*\bclass\s*=\s*["\']a-price-decimal["\'][^>]*>([^<]*)</span>)?'
+    rb'([^<]*)</span>',
+    re.IGNORECASE
+)
+SCRIPT_PATTERN = re.compile(rb'<script\b([^>]*)>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+JAVASCRIPT_TYPE_PATTERN = re.compile(rb'\btype\s*=\s*["\']text/javascript["\']', re.IGNORECASE)
+
+# Stream product pages and stop downloading once every field has been found.
+# Disable with STREAM_PRODUCT_PAGE=0 to always download the full page.
+STREAM_PRODUCT_PAGE = os.environ.get("STREAM_PRODUCT_PAGE", "1") == "1"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bytes re-scanned at the end of the buffer so a tag split across chunks is still found
+SCAN_OVERLAP = 4096
+
+
+class FastPathStats:
+    """
+    Counters for the regex fast path.
+
+    Time saved is estimated from the average cost of the DOM path: every fast
+    path hit saves roughly one DOM parse and extraction minus its own cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.fast_time_hits = 0.0
+        self.fast_time_misses = 0.0
+        self.dom_runs = 0
+        self.dom_time = 0.0
+        self.streamed_pages = 0
+        self.early_stops = 0
+        self.stream_time = 0.0
+        self.bytes_read = 0
+        self.bytes_transferred = 0
+        self.bytes_skipped = 0
+
+    def record_fast(self, hit, duration):
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+                self.fast_time_hits += duration
+            else:
+                self.fast_time_misses += duration
+
+    def record_dom(self, duration):
+        with self._lock:
+            self.dom_runs += 1
+            self.dom_time += duration
+
+    def record_stream(self, early_stop, duration, bytes_read, bytes_transferred, bytes_skipped):
+        with self._lock:
+            self.streamed_pages += 1
+            self.early_stops += int(early_stop)
+            self.stream_time += duration
+            self.bytes_read += bytes_read
+            self.bytes_transferred += bytes_transferred
+            self.bytes_skipped += bytes_skipped
+
+    def summary(self):
+        """
+        Returns:
+            dict: Attempts, hits, hit rate and estimated seconds saved.
+        """
+        with self._lock:
+            avg_dom_time = self.dom_time / self.dom_runs if self.dom_runs else 0.0
+            time_saved = self.hits * avg_dom_time - self.fast_time_hits - self.fast_time_misses
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+                "avg_dom_time": avg_dom_time,
+                "time_saved": time_saved if self.dom_runs else None,
+                "streamed_pages": self.streamed_pages,
+                "early_stops": self.early_stops,
+                "stream_time": self.stream_time,
+                "bytes_read": self.bytes_read,
+                "bytes_transferred": self.bytes_transferred,
+                "bytes_skipped": self.bytes_skipped,
+            }
+
+
+stats = FastPathStats()
+
+
+def _decode(raw, encoding):
+    return raw.decode(encoding or "utf-8", errors="replace")
+
+
+def _text(raw, encoding):
+    # Same as BeautifulSoup's get_text(strip=True) for a run of plain text
+    return html.unescape(_decode(raw, encoding)).strip()
+
+
+def extract_title(content, encoding=None):
+    """
+    Find the text of the first productTitle span if it holds plain text only.
+
+    Args:
+        content (bytes): Raw page body.
+        encoding (str, optional): Page encoding, defaults to UTF-8.
+
+    Returns:
+        str: Product name, or None.
+    """
+    match = TITLE_OPEN_PATTERN.search(content)
+    if not match:
+        return None
+    end = content.find(b'<', match.end())
+    if end == -1 or not content.startswith(b'</span', end):
+        # Nested markup, leave it to the DOM
+        return None
+    title = _text(content[match.end():end], encoding)
+    if not title or title == "Surprice Product with maximum discount":
+        return None
+    return title
+
+
+def extract_price(content, encoding=None):
+    """
+    Find the text of the first a-price-whole span, including its decimal separator.
+
+    Args:
+        content (bytes): Raw page body.
+        encoding (str, optional): Page encoding, defaults to UTF-8.
+
+    Returns:
+        str: Price text, or None.
+    """
+    opening = PRICE_OPEN_PATTERN.search(content)
+    if not opening:
+        return None
+    match = PRICE_BODY_PATTERN.match(content, opening.end())
+    if not match:
+        # Unexpected nested markup, leave it to the DOM
+        return None
+    price = "".join(_text(part, encoding) for part in match.groups() if part)
+    return price or None
+
+
+def extract_scripts(content, encoding=None):
+    """
+    Get the text of every text/javascript script without building a DOM.
+
+    Args:
+        content (bytes): Raw page body.
+        encoding (str, optional): Page encoding, defaults to UTF-8.
+
+    Returns:
+        list: Script sources in document order.
+    """
+    return [
+        _decode(body, encoding)
+        for attrs, body in SCRIPT_PATTERN.findall(content)
+        if JAVASCRIPT_TYPE_PATTERN.search(attrs)
+    ]
+
+
+def extract_product_details(content, encoding=None):
+    """
+    Try to extract name, price and a high-resolution image straight from the raw page.
+
+    Only returns a result when all three fields are found, so the caller can
+    fall back to the full DOM extraction otherwise.
+
+    Args:
+        content (bytes): Raw page body.
+        encoding (str, optional): Page encoding, defaults to UTF-8.
+
+    Returns:
+        tuple: (Product Name, Price, Image candidates) or None, the image
+        candidates being absolute URLs from the image detail scripts, best first,
+        followed by gallery images as fallbacks.
+    """
+    started = time.perf_counter()
+    details = None
+
+    product_name = extract_title(content, encoding)
+    price = extract_price(content, encoding) if product_name else None
+    if product_name and price:
+        scripts = extract_scripts(content, encoding)
+        if product_extractor.find_script_image(scripts):
+            image_candidates = product_extractor.unique_image_urls(
+                product_extractor.script_image_candidates(scripts) + product_extractor.script_gallery_images(scripts)
+            )
+            details = product_name, price, image_candidates
+
+    stats.record_fast(details is not None, time.perf_counter() - started)
+    if details:
+        print("Extracted product details with the fast path, skipping DOM construction")
+    return details
+
+
+class StreamingExtractor:
+    """
+    Incremental version of the fast path fed with chunks of a page as they arrive.
+
+    The title and price are searched from where the previous search stopped,
+    and each text/javascript script is checked for images once it is complete.
+    Unlike extract_product_details, the first high-resolution image candidate
+    wins, since later scripts have not been downloaded yet. The scripts seen so
+    far supply the other image candidates and gallery fallbacks.
+    """
+
+    def __init__(self, content_type=None):
+        # The declared charset is known up front, a <meta charset> once the head has arrived
+        self.encoding = page_parser.declared_encoding(content_type)
+        self._encoding_known = self.encoding is not None
+        self.buffer = bytearray()
+        self.product_name = None
+        self.price = None
+        self.image_url = None
+        self.image_candidates = []
+        self._scripts = []
+        self._title_pos = 0
+        self._price_pos = 0
+        self._script_pos = 0
+
+    def _next_scan_pos(self, pos):
+        return max(pos, len(self.buffer) - SCAN_OVERLAP)
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the page and look for any fields still missing.
+
+        Args:
+            chunk (bytes): Next part of the raw page body.
+
+        Returns:
+            bool: True once name, price and image have all been found.
+        """
+        self.buffer.extend(chunk)
+        content = self.buffer
+
+        if not self._encoding_known and len(content) >= page_parser.META_PROBE_BYTES:
+            self.encoding = page_parser.meta_encoding(bytes(content[:page_parser.META_PROBE_BYTES]))
+            self._encoding_known = True
+
+        if self.product_name is None:
+            match = TITLE_OPEN_PATTERN.search(content, self._title_pos)
+            if match:
+                end = content.find(b'<', match.end())
+                if end != -1 and len(content) >= end + len(b'</span'):
+                    # An empty string marks a title the fast path cannot use
+                    self.product_name = extract_title(bytes(content[match.start():end + len(b'</span')]), self.encoding) or ""
+            else:
+                self._title_pos = self._next_scan_pos(self._title_pos)
+
+        if self.price is None:
+            opening = PRICE_OPEN_PATTERN.search(content, self._price_pos)
+            if opening:
+                body = PRICE_BODY_PATTERN.match(content, opening.end())
+                if body:
+                    self.price = "".join(_text(part, self.encoding) for part in body.groups() if part)
+                elif len(content) - opening.end() > SCAN_OVERLAP:
+                    # Unexpected nested markup, leave it to the DOM
+                    self.price = ""
+            else:
+                self._price_pos = self._next_scan_pos(self._price_pos)
+
+        if self.image_url is None:
+            scripts = []
+            for match in SCRIPT_PATTERN.finditer(content, self._script_pos):
+                if JAVASCRIPT_TYPE_PATTERN.search(match.group(1)):
+                    scripts.append(_decode(match.group(2), self.encoding))
+                self._script_pos = match.end()
+            if scripts:
+                self._scripts.extend(scripts)
+                image_url = product_extractor.find_script_image(scripts)
+                if image_url:
+                    self.image_url = product_extractor.absolute_image_url(image_url)
+                    self.image_candidates = product_extractor.unique_image_urls(
+                        [image_url]
+                        + product_extractor.script_image_alternatives(self._scripts)
+                        + product_extractor.script_gallery_images(self._scripts)
+                    )
+
+        return self.is_complete()
+
+    def is_complete(self):
+        return bool(self.product_name and self.price and self.image_url)
+
+
+def stream_product_details(response, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Download a streamed response, closing it as soon as the fast path has every field.
+
+    Args:
+        response (requests.Response): A response opened with stream=True.
+        chunk_size (int): Bytes read per chunk.
+
+    Only the time spent in the extractor counts as fast path time, the
+    download itself is recorded with the stream counters.
+
+    Returns:
+        tuple: (details, content) where details is (Product Name, Price, Image candidates)
+        or None, and content is the body read so far. When details is None the
+        whole body has been read so the caller can fall back to the DOM.
+    """
+    started = time.perf_counter()
+    extract_time = 0.0
+    extractor = StreamingExtractor(response.headers.get("Content-Type"))
+    early_stop = False
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            feed_started = time.perf_counter()
+            complete = extractor.feed(chunk)
+            extract_time += time.perf_counter() - feed_started
+            if complete:
+                early_stop = True
+                break
+        # Bytes read off the wire, still compressed if the page was sent gzipped
+        bytes_transferred = response.raw.tell()
+    finally:
+        response.close()
+
+    content = bytes(extractor.buffer)
+    details = None
+    if early_stop:
+        details = extractor.product_name, extractor.price, extractor.image_candidates
+        print(f"Found all product details after {len(content)} bytes, closed the connection early")
+
+    # Content-Length is the transferred size, compressed or not, so it compares with the wire bytes
+    bytes_skipped = 0
+    content_length = response.headers.get("Content-Length")
+    if early_stop and content_length and content_length.isdigit():
+        bytes_skipped = max(int(content_length) - bytes_transferred, 0)
+    stats.record_stream(early_stop, time.perf_counter() - started, len(content), bytes_transferred, bytes_skipped)
+    stats.record_fast(early_stop, extract_time)
+    return details, content
@@ -0,0 +1,161 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rate_limiter
+
+# Keep-alive pool size per host. Hosts not listed here use DEFAULT_POOL_SIZE.
+POOL_SIZES = {
+    "amzn.to": 4,
+    "www.amazon.in": 8,
+    "www.amazon.com": 8,
+    "m.media-amazon.com": 8,
+    "images-na.ssl-images-amazon.com": 4,
+    "graph.facebook.com": 4,
+}
+
+DEFAULT_POOL_SIZE = 4
+
+# Maximum number of distinct hosts kept in the fallback adapter's pool manager
+DEFAULT_MAX_HOSTS = 20
+
+_lock = threading.RLock()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that waits for the target host's token bucket before every request.
+
+    Every session mounts these adapters, so all scraping, image checks and
+    Graph API calls are paced per host in one place.
+    """
+
+    def send(self, request, **kwargs):
+        rate_limiter.acquire(urlparse(request.url).netloc)
+        return super().send(request, **kwargs)
+
+
+_adapters = None
+_default_session = None
+
+
+def _build_adapters():
+    """
+    Create one HTTPAdapter per configured host plus a fallback adapter.
+
+    Returns:
+        dict: URL prefix -> HTTPAdapter, in the form expected by Session.mount.
+    """
+    adapters = {}
+    for host, pool_size in POOL_SIZES.items():
+        adapter = RateLimitedAdapter(pool_connections=2, pool_maxsize=pool_size)
+        adapters[f"https://{host}/"] = adapter
+        adapters[f"http://{host}/"] = adapter
+
+    fallback = RateLimitedAdapter(pool_connections=DEFAULT_MAX_HOSTS, pool_maxsize=DEFAULT_POOL_SIZE)
+    adapters["https://"] = fallback
+    adapters["http://"] = fallback
+    return adapters
+
+
+def _get_adapters():
+    global _adapters
+    with _lock:
+        if _adapters is None:
+            _adapters = _build_adapters()
+        return _adapters
+
+
+def new_session():
+    """
+    Create a session with its own cookie jar that shares the module's connection pools.
+
+    Sessions are cheap: the TCP and TLS connections live in the shared adapters,
+    so a fresh session per scrape attempt still reuses keep-alive connections.
+    Do not call close() on the returned session, as that would close the shared pools.
+
+    Returns:
+        requests.Session: A session mounted on the shared adapters.
+    """
+    session = requests.Session()
+    for prefix, adapter in _get_adapters().items():
+        session.mount(prefix, adapter)
+    return session
+
+
+def get_session():
+    """
+    Get the module-level session used for stateless calls such as image checks and Graph API posts.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _default_session
+    with _lock:
+        if _default_session is None:
+            _default_session = new_session()
+        return _default_session
+
+
+def request(method, url, **kwargs):
+    """
+    Send a request through the shared session.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Target URL.
+        **kwargs: Passed through to requests.Session.request.
+
+    Returns:
+        requests.Response: The response.
+    """
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def pool_stats():
+    """
+    Get connection pool hit and miss counters per host.
+
+    A hit is a request served over an existing keep-alive connection, a miss is
+    a request that had to open a new TCP/TLS connection.
+
+    Returns:
+        dict: host -> {"requests", "hits", "misses"}.
+    """
+    stats = {}
+    seen = set()
+    for adapter in _get_adapters().values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {"requests": 0, "hits": 0, "misses": 0})
+            host_stats["requests"] += pool.num_requests
+            host_stats["misses"] += pool.num_connections
+            host_stats["hits"] += max(pool.num_requests - pool.num_connections, 0)
+    return stats
+
+
+def print_pool_stats():
+    for host, host_stats in sorted(pool_stats().items()):
+        print(f"HTTP pool {host}: {host_stats['requests']} requests, "
+              f"{host_stats['hits']} hits, {host_stats['misses']} misses")
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+from cache import PersistentCache, cache_path
+from product_extractor import optimize_amazon_image_url
+
+# Image candidates checked at the same time, best ranked first
+MAX_VERIFIED_CANDIDATES = 3
+
+IMAGE_VERIFY_TIMEOUT = 10
+
+# Outcomes of an image check: it loaded, the CDN answered with an error, or the CDN could not be reached
+IMAGE_LOADED = "loaded"
+IMAGE_BROKEN = "broken"
+IMAGE_UNREACHABLE = "unreachable"
+
+# Amazon CDN image URLs are immutable, so a successful check holds for a month.
+# Failures are only trusted for an hour in case the CDN had a hiccup.
+IMAGE_CHECK_TTL = 30 * 24 * 3600
+IMAGE_CHECK_FAILURE_TTL = 3600
+IMAGE_CHECK_MAX_ENTRIES = 10000
+
+image_check_cache = PersistentCache(cache_path("image_checks.json"), IMAGE_CHECK_TTL, IMAGE_CHECK_MAX_ENTRIES)
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="image-verify")
+
+
+def check_image_url(image_url, timeout=IMAGE_VERIFY_TIMEOUT):
+    """
+    Check that an image URL loads, reusing earlier results for the same normalized URL.
+
+    Args:
+        image_url (str): Image URL.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        str: IMAGE_LOADED if a HEAD request returns 200, IMAGE_BROKEN for any
+        other status and IMAGE_UNREACHABLE if the request itself failed.
+    """
+    cache_key = optimize_amazon_image_url(image_url)
+    cached = image_check_cache.get(cache_key)
+    if cached:
+        print(f"Using cached image check for {image_url}: {cached['status']}")
+        return IMAGE_LOADED if cached["status"] == 200 else IMAGE_BROKEN
+
+    try:
+        response = http_client.head(image_url, timeout=timeout)
+    except Exception as e:
+        # Network errors are not cached, the next rotation tries again
+        print(f"WARNING: Error verifying image URL {image_url}: {e}")
+        return IMAGE_UNREACHABLE
+
+    image_check_cache.set(
+        cache_key,
+        {
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "content_length": response.headers.get("Content-Length"),
+        },
+        ttl=IMAGE_CHECK_TTL if response.status_code == 200 else IMAGE_CHECK_FAILURE_TTL
+    )
+    if response.status_code != 200:
+        print(f"WARNING: Image URL {image_url} returned status code {response.status_code}")
+        return IMAGE_BROKEN
+    return IMAGE_LOADED
+
+
+def verify_image_candidates(candidates, max_candidates=MAX_VERIFIED_CANDIDATES, timeout=IMAGE_VERIFY_TIMEOUT):
+    """
+    Verify the best ranked image candidates concurrently and pick the best one that loads.
+
+    Returns as soon as a candidate has loaded and every better ranked one has
+    failed, without waiting for the checks of worse ranked candidates.
+
+    Args:
+        candidates (list): Image URLs, best first.
+        max_candidates (int): Number of candidates checked.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        tuple: (image_url, outcome) where image_url is the best ranked image URL
+        that loaded, or None if none did. outcome is IMAGE_LOADED, IMAGE_BROKEN
+        if any candidate answered with an error, IMAGE_UNREACHABLE if none
+        could be checked at all, or None if there were no candidates.
+    """
+    candidates = candidates[:max_candidates]
+    if not candidates:
+        return None, None
+
+    started = time.perf_counter()
+    print(f"Verifying {len(candidates)} image candidate(s) concurrently")
+    futures = [_executor.submit(check_image_url, image_url, timeout) for image_url in candidates]
+
+    # All checks run at once, so waiting on them in rank order costs no more than the slowest needed one
+    outcome = IMAGE_UNREACHABLE
+    for rank, future in enumerate(futures):
+        result = future.result()
+        if result == IMAGE_LOADED:
+            print(f"Image URL verified successfully: {candidates[rank]} "
+                  f"(rank {rank + 1}, {(time.perf_counter() - started) * 1000:.0f} ms)")
+            return candidates[rank], IMAGE_LOADED
+        if result == IMAGE_BROKEN:
+            outcome = IMAGE_BROKEN
+
+    print(f"WARNING: No image candidate could be verified ({outcome})")
+    return None, outcome
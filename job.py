@@ -1,11 +1,10 @@
-import pandas as pd
-import requests
 import os
-import time
-import random
 from datetime import datetime
 import pytz
-import re
+import http_client
+from cursor_store import cursor_store
+import workbook_snapshot
+import post_table
 
 def post_to_facebook(page_id, access_token, message, image_url=None, link_url=None):
     """
@@ -50,7 +49,7 @@ def post_to_facebook(page_id, access_token, message, image_url=None, link_url=No
             }
             print("Posting text-only message to Facebook")
 
-        response = requests.post(url, data=payload)
+        response = http_client.post(url, data=payload)
         result = response.json()
         print(f"Facebook API response: {result}")
         return result
@@ -71,9 +70,7 @@ def extract_url_from_text(text):
     if not isinstance(text, str):
         return None
     
-    # Regular expression pattern to match URLs
-    url_pattern = r'https?://[^\s]+'
-    match = re.search(url_pattern, text)
+    match = post_table.URL_PATTERN.search(text)
     
     if match:
         return match.group(0)
@@ -83,72 +80,43 @@ def get_next_post_content(file_path, index_file='.current_row_index'):
     """
     Read the next row from the Excel file using round-robin rotation.
     
+    Rows without a message are skipped through the snapshot's validity bitmap,
+    and every row's links and post kind come from the post table classified
+    once per workbook version.
+    
     Args:
         file_path (str): Path to the Excel file.
-        index_file (str): File to store the current index position.
+        index_file (str): Name of the rotation cursor.
         
     Returns:
         tuple: (message, image_url, link_url) or (None, None, None) if not found.
     """
     try:
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        if df.empty:
-            print("Excel file is empty.")
-            return None, None, None
-        
-        # Get the current index, or start from 0 if file doesn't exist
-        current_index = 0
-        try:
-            if os.path.exists(index_file):
-                with open(index_file, 'r') as f:
-                    current_index = int(f.read().strip())
-        except:
-            current_index = 0
-        
-        # Get the total number of rows
-        total_rows = len(df)
+        # Read the compiled snapshot of the Excel file, only rebuilt when the workbook changes
+        with workbook_snapshot.load_snapshot(file_path, columns=2, validator="text") as snapshot:
         
-        # Round-robin: Ensure index is in valid range
-        current_index = current_index % total_rows
+            if not len(snapshot):
+                print("Excel file is empty.")
+                return None, None, None
         
-        # Get the content from the current row
-        # Assuming: Column A (index 0) = message content, Column B (index 1) = image URL (optional)
-        row = df.iloc[current_index]
+            # Get the total number of rows
+            total_rows = len(snapshot)
         
-        message = row.iloc[0] if len(row) > 0 else None
-        image_url = row.iloc[1] if len(row) > 1 and pd.notna(row.iloc[1]) else None
+            # Round-robin: Atomically claim the next valid index and advance the cursor past it,
+            # so overlapping runs never post the same row
+            current_index = cursor_store.claim_next(index_file, total_rows, snapshot.next_valid)
+            if current_index is None:
+                print("No valid message found in the Excel file.")
+                return None, None, None
         
-        # Extract link URL from message if present
-        link_url = None
-        if isinstance(message, str):
-            link_url = extract_url_from_text(message)
+            # Get the pre-classified content of the current row
+            # Column A = message content, Column B = image URL, or a link URL if it is not an image (optional)
+            post = post_table.load_post_table(snapshot).iloc[current_index]
         
-        # If there's no explicit image URL but we have a link URL in column B,
-        # it should be treated as a link URL rather than an image URL
-        if image_url and isinstance(image_url, str) and image_url.startswith('http'):
-            if not image_url.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                if not link_url:  # Only set link_url if we don't already have one from the message
-                    link_url = image_url
-                    image_url = None
+            print(f"Selected content from row #{current_index+1} out of {total_rows} rows (Excel row {current_index+2}), "
+                  f"{post['post_kind']} post")
         
-        print(f"Selected content from row #{current_index+1} out of {total_rows} rows (Excel row {current_index+2})")
-        
-        # Update the index for next time (increment and save)
-        next_index = (current_index + 1) % total_rows
-        with open(index_file, 'w') as f:
-            f.write(str(next_index))
-        
-        # Check if the message is valid
-        if isinstance(message, str) and message.strip():
-            return message.strip(), image_url, link_url
-        else:
-            print(f"Invalid or empty message in Excel file at row {current_index+1}.")
-            # Try next row if this one is invalid
-            with open(index_file, 'w') as f:
-                f.write(str(next_index))
-            return get_next_post_content(file_path, index_file)  # Recursive call to get next valid content
+            return post["message"], post["image_url"], post["link_url"]
 
     except Exception as e:
         print(f"Error reading Excel file: {e}")
@@ -195,9 +163,6 @@ def main():
         if image_url:
             print(f"With image: {image_url}")
         
-        # Add a small delay before API call
-        time.sleep(random.uniform(1, 2))
-        
         # Post to Facebook - prioritize link posts over image posts
         if link_url:
             response = post_to_facebook(PAGE_ID, ACCESS_TOKEN, message, link_url=link_url)
@@ -212,7 +177,6 @@ def main():
             # If posting with link or image failed, try text-only as fallback
             if (link_url or image_url) and 'error' in response:
                 print("Link/Image post failed. Trying text-only post as fallback...")
-                time.sleep(random.uniform(1, 2))
                 response = post_to_facebook(PAGE_ID, ACCESS_TOKEN, message)
                 
                 if 'id' in response:
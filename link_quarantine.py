@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+from contextlib import closing
+from datetime import datetime
+
+from cache import cache_path
+import cursor_store
+
+# A link's first failure keeps it out of the rotation for an hour, doubling with every further failure
+QUARANTINE_BASE_SECONDS = 3600
+QUARANTINE_MAX_SECONDS = 14 * 24 * 3600
+
+# Failure history is forgotten this long after a link becomes eligible again
+QUARANTINE_MEMORY_SECONDS = 30 * 24 * 3600
+QUARANTINE_MAX_ENTRIES = 5000
+
+# Where the quarantine lived before it moved into the state database
+LEGACY_QUARANTINE_PATH = cache_path("link_quarantine.json")
+
+UPSERT_QUARANTINE_SQL = (
+    "INSERT INTO quarantine (link, failures, last_error, failed_at, next_eligible, forget_at) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(link) DO UPDATE SET failures = excluded.failures, last_error = excluded.last_error, "
+    "failed_at = excluded.failed_at, next_eligible = excluded.next_eligible, forget_at = excluded.forget_at"
+)
+
+
+class LinkQuarantine:
+    """
+    Persisted negative cache of affiliate links that failed to scrape.
+
+    Each entry records the failure count, the last error and when the link may
+    be tried again. A successful scrape removes the entry. Entries live in a
+    table of the shared SQLite state database and every call reads or updates
+    single rows, so a reset from another process takes effect immediately.
+    """
+
+    def __init__(self, path=cursor_store.CURSOR_DB, base_seconds=QUARANTINE_BASE_SECONDS,
+                 max_seconds=QUARANTINE_MAX_SECONDS, legacy_path=LEGACY_QUARANTINE_PATH):
+        self.path = path
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.legacy_path = legacy_path
+        self._initialized = False
+
+    def _connect(self):
+        connection = cursor_store.connect(self.path)
+        if not self._initialized:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS quarantine ("
+                "link TEXT PRIMARY KEY, failures INTEGER NOT NULL, last_error TEXT, failed_at REAL NOT NULL, "
+                "next_eligible REAL NOT NULL, forget_at REAL NOT NULL)"
+            )
+            self._migrate_legacy(connection)
+            self._initialized = True
+        return connection
+
+    def _migrate_legacy(self, connection):
+        # The quarantine used to be a JSON cache file, import what is left of it once
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            rows = [
+                (link, entry["failures"], entry["last_error"], entry["failed_at"], entry["next_eligible"], forget_at)
+                for link, (entry, forget_at) in data.items()
+                if forget_at > now
+            ]
+            connection.executemany(
+                "INSERT OR IGNORE INTO quarantine (link, failures, last_error, failed_at, next_eligible, forget_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+            print(f"Migrated {len(rows)} quarantined link(s) from {self.legacy_path}")
+        except Exception as e:
+            print(f"Error migrating quarantine file {self.legacy_path}: {e}")
+
+    def record_failure(self, link, error):
+        """
+        Quarantine a link, doubling its quarantine with every consecutive failure.
+
+        Args:
+            link (str): The affiliate link.
+            error (str): Description of the last error.
+
+        Returns:
+            dict: The link's entry.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            # Read and update in one write transaction, so concurrent failures are all counted
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT failures FROM quarantine WHERE link = ? AND forget_at > ?", (link, now)
+                ).fetchone()
+                failures = (row[0] if row else 0) + 1
+                quarantine_seconds = min(self.base_seconds * 2 ** (failures - 1), self.max_seconds)
+                entry = {
+                    "failures": failures,
+                    "last_error": error,
+                    "failed_at": now,
+                    "next_eligible": now + quarantine_seconds,
+                }
+                connection.execute(UPSERT_QUARANTINE_SQL, (
+                    link, failures, error, now, entry["next_eligible"],
+                    entry["next_eligible"] + QUARANTINE_MEMORY_SECONDS
+                ))
+                # Forget expired history and keep only the most recent failures
+                connection.execute("DELETE FROM quarantine WHERE forget_at <= ?", (now,))
+                connection.execute(
+                    "DELETE FROM quarantine WHERE link NOT IN "
+                    "(SELECT link FROM quarantine ORDER BY failed_at DESC LIMIT ?)",
+                    (QUARANTINE_MAX_ENTRIES,)
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        print(f"Quarantined {link} for {quarantine_seconds / 3600:.1f}h after {failures} failure(s): {error}")
+        return entry
+
+    def record_success(self, link):
+        if self._delete(link):
+            print(f"Released {link} from quarantine")
+
+    def _delete(self, link):
+        with closing(self._connect()) as connection:
+            return connection.execute("DELETE FROM quarantine WHERE link = ?", (link,)).rowcount > 0
+
+    def is_quarantined(self, link):
+        """
+        Args:
+            link (str): The affiliate link.
+
+        Returns:
+            bool: True if the link should be skipped for now.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT 1 FROM quarantine WHERE link = ? AND next_eligible > ?", (link, time.time())
+            ).fetchone()
+        return row is not None
+
+    def list(self):
+        """
+        Returns:
+            list: (link, entry) pairs, soonest eligible first.
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT link, failures, last_error, failed_at, next_eligible FROM quarantine "
+                "WHERE forget_at > ? ORDER BY next_eligible",
+                (time.time(),)
+            ).fetchall()
+        return [
+            (link, {"failures": failures, "last_error": last_error, "failed_at": failed_at,
+                    "next_eligible": next_eligible})
+            for link, failures, last_error, failed_at, next_eligible in rows
+        ]
+
+    def reset(self, link=None):
+        """
+        Release one link, or every link if none is given.
+
+        Args:
+            link (str, optional): The affiliate link.
+        """
+        if link is None:
+            with closing(self._connect()) as connection:
+                connection.execute("DELETE FROM quarantine")
+        else:
+            self._delete(link)
+
+
+quarantine = LinkQuarantine()
+
+
+if __name__ == "__main__":
+    # Usage: python link_quarantine.py [list | reset [link]]
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "reset":
+        quarantine.reset(sys.argv[2] if len(sys.argv) > 2 else None)
+        print("Quarantine reset")
+    else:
+        for quarantined_link, quarantine_entry in quarantine.list():
+            eligible = datetime.fromtimestamp(quarantine_entry["next_eligible"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{quarantined_link}: {quarantine_entry['failures']} failure(s), "
+                  f"eligible {eligible}, last error: {quarantine_entry['last_error']}")
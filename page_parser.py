@@ -0,0 +1,337 @@
+import os
+import re
+import sys
+import time
+import codecs
+import threading
+import tracemalloc
+import importlib.util
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Tree builder used for product pages: "auto", "lxml" or "html.parser".
+# "auto" picks the fastest one installed in the container.
+HTML_PARSER = os.environ.get("HTML_PARSER", "auto")
+
+# Fastest first. html.parser ships with Python and is always available.
+PARSER_PREFERENCE = ["lxml", "html.parser"]
+
+# Build only the page regions the extractors read instead of the whole tree.
+# Cuts memory use on large product pages; disable with HTML_PARSE_REGIONS=0.
+HTML_PARSE_REGIONS = os.environ.get("HTML_PARSE_REGIONS", "1") == "1"
+
+# Subtrees kept when parsing by region, covering every selector in product_extractor
+REGION_TAGS = {"title", "h1"}
+REGION_IDS = {
+    # Name
+    "productTitle", "title",
+    # Price
+    "priceblock_ourprice", "corePriceDisplay_desktop_feature_div", "corePrice_feature_div",
+    "corePrice_desktop", "price",
+    # Images
+    "landingImage", "imgBlkFront", "main-image-container", "imgTagWrapperId",
+    "imageBlock_feature_div", "imageBlock", "main-image", "product-image",
+}
+REGION_CLASSES = {
+    "product-title-word-break", "product-title",
+    "a-price", "a-price-whole", "a-offscreen", "price",
+    "a-dynamic-image", "product-image",
+}
+REGION_ATTRS = {"data-zoom-hires", "data-old-hires", "data-a-dynamic-image"}
+REGION_SCRIPT_TYPES = {"application/ld+json", "text/javascript"}
+
+# Bytes at the start of a page searched for a <meta charset> declaration
+META_PROBE_BYTES = 4096
+
+# Used when a page is neither declared nor valid UTF-8, as browsers do
+FALLBACK_ENCODING = "cp1252"
+
+CONTENT_TYPE_CHARSET_PATTERN = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(
+    rb'<meta\b[^>]*?\bcharset\s*=\s*["\']?([\w.:-]+)',
+    re.IGNORECASE
+)
+
+_PARSER_MODULES = {
+    "lxml": "lxml",
+    "html.parser": None,
+}
+
+_selected_parser = None
+
+
+def is_parser_available(parser):
+    """
+    Check whether a BeautifulSoup tree builder can be used.
+
+    Args:
+        parser (str): Parser name, e.g. "lxml".
+
+    Returns:
+        bool: True if the parser is known and its module is installed.
+    """
+    if parser not in _PARSER_MODULES:
+        return False
+    module = _PARSER_MODULES[parser]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_parsers():
+    """
+    Returns:
+        list: Installed parser names, fastest first.
+    """
+    return [parser for parser in PARSER_PREFERENCE if is_parser_available(parser)]
+
+
+def get_parser():
+    """
+    Resolve the configured HTML_PARSER to an installed parser.
+
+    Falls back to html.parser if the configured parser is unknown or not installed.
+
+    Returns:
+        str: Parser name to pass to BeautifulSoup.
+    """
+    global _selected_parser
+    if _selected_parser is None:
+        if HTML_PARSER != "auto" and is_parser_available(HTML_PARSER):
+            _selected_parser = HTML_PARSER
+        else:
+            if HTML_PARSER != "auto":
+                print(f"HTML parser '{HTML_PARSER}' is not available, picking the fastest installed one")
+            _selected_parser = available_parsers()[0]
+        print(f"Using HTML parser: {_selected_parser}")
+    return _selected_parser
+
+
+class DecodeStats:
+    """
+    Counts how each page's encoding was determined and the time spent decoding.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sources = {"header": 0, "meta": 0, "utf-8": 0, "fallback": 0}
+        self.pages = 0
+        self.seconds = 0.0
+
+    def record(self, source, seconds):
+        with self._lock:
+            self.sources[source] += 1
+            self.pages += 1
+            self.seconds += seconds
+
+    def summary(self):
+        """
+        Returns:
+            dict: Pages decoded, total and average seconds, and counts per encoding source.
+        """
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "seconds": self.seconds,
+                "avg_seconds": self.seconds / self.pages if self.pages else 0.0,
+                "sources": dict(self.sources),
+            }
+
+
+decode_stats = DecodeStats()
+
+
+def _valid_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def declared_encoding(content_type):
+    """
+    Get the charset declared in a Content-Type header.
+
+    Unlike requests, this does not assume ISO-8859-1 for text/html without a charset.
+
+    Args:
+        content_type (str): Content-Type header value.
+
+    Returns:
+        str: Normalized codec name, or None if no valid charset is declared.
+    """
+    if not content_type:
+        return None
+    match = CONTENT_TYPE_CHARSET_PATTERN.search(content_type)
+    return _valid_encoding(match.group(1)) if match else None
+
+
+def meta_encoding(content):
+    """
+    Probe the start of a page for <meta charset="..."> or an http-equiv Content-Type.
+
+    Args:
+        content (bytes): Raw page body, or at least its first META_PROBE_BYTES.
+
+    Returns:
+        str: Normalized codec name, or None.
+    """
+    match = META_CHARSET_PATTERN.search(content[:META_PROBE_BYTES])
+    return _valid_encoding(match.group(1).decode("ascii", errors="ignore")) if match else None
+
+
+def sniff_encoding(content, content_type=None):
+    """
+    Determine a page's encoding cheaply from the header or the meta probe.
+
+    Args:
+        content (bytes): Raw page body.
+        content_type (str, optional): Content-Type header value.
+
+    Returns:
+        tuple: (encoding, source) where source is "header" or "meta", or (None, None).
+    """
+    encoding = declared_encoding(content_type)
+    if encoding:
+        return encoding, "header"
+    encoding = meta_encoding(content)
+    if encoding:
+        return encoding, "meta"
+    return None, None
+
+
+def decode_page(content, content_type=None):
+    """
+    Decode a page body once, without statistical charset detection.
+
+    Tries the declared charset, then a <meta charset> probe, then strict UTF-8,
+    and finally FALLBACK_ENCODING.
+
+    Args:
+        content (bytes): Raw page body.
+        content_type (str, optional): Content-Type header value.
+
+    Returns:
+        tuple: (text, encoding).
+    """
+    started = time.perf_counter()
+    encoding, source = sniff_encoding(content, content_type)
+    text = None
+    if encoding:
+        try:
+            text = content.decode(encoding)
+        except UnicodeDecodeError:
+            text = None
+
+    if text is None:
+        try:
+            text = content.decode("utf-8")
+            encoding, source = "utf-8", "utf-8"
+        except UnicodeDecodeError:
+            text = content.decode(FALLBACK_ENCODING, errors="replace")
+            encoding, source = FALLBACK_ENCODING, "fallback"
+
+    decode_stats.record(source, time.perf_counter() - started)
+    return text, encoding
+
+
+def is_region_tag(name, attrs):
+    """
+    Decide whether a tag starts a subtree the extractors need.
+
+    Args:
+        name (str): Tag name.
+        attrs (dict): Tag attributes as seen by the tree builder.
+
+    Returns:
+        bool: True if the tag and its descendants should be kept.
+    """
+    if name in REGION_TAGS:
+        return True
+    if name == "script":
+        return attrs.get("type") in REGION_SCRIPT_TYPES
+    if attrs.get("id") in REGION_IDS:
+        return True
+    if any(attr in attrs for attr in REGION_ATTRS):
+        return True
+    classes = attrs.get("class")
+    if classes:
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(css_class in REGION_CLASSES for css_class in classes)
+    return False
+
+
+def make_soup(markup, parser=None, regions_only=None):
+    """
+    Parse an HTML document with the configured backend.
+
+    Args:
+        markup (str): HTML document.
+        parser (str, optional): Override the configured parser.
+        regions_only (bool, optional): Override HTML_PARSE_REGIONS.
+
+    Returns:
+        BeautifulSoup: The parsed document.
+    """
+    if regions_only is None:
+        regions_only = HTML_PARSE_REGIONS
+    parse_only = SoupStrainer(is_region_tag) if regions_only else None
+    return BeautifulSoup(markup, parser or get_parser(), parse_only=parse_only)
+
+
+def profile_decoding(content):
+    """
+    Compare decode_page against the statistical detection requests falls back to.
+
+    Args:
+        content (bytes): Raw page body.
+
+    Returns:
+        dict: Seconds taken by each approach, "detection" is None if charset_normalizer is not installed.
+    """
+    started = time.perf_counter()
+    decode_page(content)
+    results = {"decode_page": time.perf_counter() - started, "detection": None}
+
+    if importlib.util.find_spec("charset_normalizer") is not None:
+        import charset_normalizer
+        started = time.perf_counter()
+        best = charset_normalizer.from_bytes(content).best()
+        str(best) if best else content.decode("utf-8", errors="replace")
+        results["detection"] = time.perf_counter() - started
+    return results
+
+
+def profile_parse(markup, parser=None):
+    """
+    Compare parse time and peak memory of a full parse against a region-limited parse.
+
+    Args:
+        markup (str): HTML document.
+        parser (str, optional): Override the configured parser.
+
+    Returns:
+        dict: {"full": {...}, "regions": {...}} with "seconds" and "peak_bytes" each.
+    """
+    results = {}
+    for mode, regions_only in [("full", False), ("regions", True)]:
+        tracemalloc.start()
+        started = time.perf_counter()
+        soup = make_soup(markup, parser, regions_only=regions_only)
+        seconds = time.perf_counter() - started
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del soup
+        results[mode] = {"seconds": seconds, "peak_bytes": peak_bytes}
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python page_parser.py page.html
+    with open(sys.argv[1], 'rb') as f:
+        raw_page = f.read()
+    for method, seconds in profile_decoding(raw_page).items():
+        if seconds is not None:
+            print(f"decode with {method}: {seconds:.3f}s")
+    page, _ = decode_page(raw_page)
+    for mode, result in profile_parse(page).items():
+        print(f"{mode}: {result['seconds']:.3f}s, peak {result['peak_bytes'] / 1024 / 1024:.1f} MiB")
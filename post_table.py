@@ -0,0 +1,112 @@
+import os
+import re
+import pickle
+import tempfile
+import threading
+
+import pandas as pd
+
+# First URL in a message
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# How each row is posted: a link preview on the feed, a photo, or a text-only feed post
+POST_KIND_FEED = "feed"
+POST_KIND_PHOTO = "photo"
+POST_KIND_TEXT = "text"
+
+POST_COLUMNS = ["message", "image_url", "link_url", "post_kind"]
+
+_lock = threading.Lock()
+# Snapshot path -> (workbook sha1, table), so a resident process classifies each workbook version once
+_tables = {}
+
+
+def build_post_table(rows):
+    """
+    Classify job posts with vectorized string operations.
+
+    Column A holds the message and column B an optional image. A column B URL
+    that does not end in an image extension is used as the link instead when
+    the message has no URL of its own.
+
+    Args:
+        rows (list): (message, image) pairs, each a string or None.
+
+    Returns:
+        pandas.DataFrame: One row per input row with POST_COLUMNS, missing values as None.
+    """
+    raw = pd.DataFrame(rows, columns=["message", "image"], dtype=object)
+    messages = raw["message"].astype("string")
+    images = raw["image"].astype("string")
+
+    link_urls = messages.str.extract(f"({URL_PATTERN.pattern})", expand=False)
+    # Column B links are only used when the message has no link of its own
+    image_is_link = (
+        images.str.startswith("http").fillna(False)
+        & ~images.str.lower().str.endswith(IMAGE_EXTENSIONS).fillna(False)
+        & link_urls.isna()
+    )
+    link_urls = link_urls.mask(image_is_link, images)
+    image_urls = images.mask(image_is_link)
+
+    table = pd.DataFrame({
+        "message": messages.str.strip(),
+        "image_url": image_urls,
+        "link_url": link_urls,
+    })
+    table["post_kind"] = POST_KIND_TEXT
+    table.loc[table["image_url"].notna(), "post_kind"] = POST_KIND_PHOTO
+    table.loc[table["link_url"].notna(), "post_kind"] = POST_KIND_FEED
+    return table.astype(object).where(table.notna(), None)
+
+
+def _table_path(snapshot):
+    return f"{snapshot.path}.posts.pkl"
+
+
+def load_post_table(snapshot):
+    """
+    Get the classified post table of a workbook snapshot, building it once per workbook version.
+
+    The table is kept in memory and pickled next to the snapshot, tagged with
+    the workbook's hash, so it is only rebuilt after the workbook changes.
+
+    Args:
+        snapshot (WorkbookSnapshot): Snapshot of the job workbook, with at least two columns.
+
+    Returns:
+        pandas.DataFrame: The post table, row for row aligned with the snapshot.
+    """
+    with _lock:
+        cached = _tables.get(snapshot.path)
+        if cached and cached[0] == snapshot.sha1:
+            return cached[1]
+
+        table = None
+        path = _table_path(snapshot)
+        try:
+            with open(path, 'rb') as f:
+                sha1, table = pickle.load(f)
+            if sha1 != snapshot.sha1:
+                table = None
+        except Exception:
+            table = None
+
+        if table is None:
+            table = build_post_table([snapshot.row(index)[:2] for index in range(len(snapshot))])
+            # A unique temporary file per build, so concurrent processes never write into each other's file
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                            dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump((snapshot.sha1, table), f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            print(f"Classified {len(table)} posts: {table['post_kind'].value_counts().to_dict()}")
+
+        _tables[snapshot.path] = (snapshot.sha1, table)
+        return table
@@ -0,0 +1,114 @@
+import re
+import time
+
+from cache import PersistentCache, cache_path
+import redirects
+
+# Prices change often, names and images almost never
+PRICE_TTL = 6 * 3600
+STATIC_TTL = 7 * 24 * 3600
+PRODUCT_CACHE_MAX_ENTRIES = 2000
+
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?#]|$)', re.IGNORECASE)
+
+
+def extract_asin(url):
+    """
+    Extract the canonical ASIN from an Amazon product URL.
+
+    Args:
+        url (str): Product URL, e.g. https://www.amazon.in/Some-Name/dp/B0ABCDEFGH/?tag=x
+
+    Returns:
+        str: Upper-case ASIN, or None if the URL has none.
+    """
+    if not url:
+        return None
+    match = ASIN_PATTERN.search(url)
+    return match.group(1).upper() if match else None
+
+
+class ProductDetailsCache:
+    """
+    Caches the (product_name, price, image_url) tuple returned by get_product_details per ASIN.
+
+    The price and the static fields (name and image) have separate TTLs. A full
+    hit needs a fresh price; the static fields outlive it and can still fill in
+    a name or image a later scrape failed to find.
+    """
+
+    def __init__(self, path, price_ttl=PRICE_TTL, static_ttl=STATIC_TTL, max_entries=PRODUCT_CACHE_MAX_ENTRIES):
+        self.price_ttl = price_ttl
+        self.cache = PersistentCache(path, static_ttl, max_entries)
+
+    def get(self, asin):
+        """
+        Get the full product details if the price is still fresh.
+
+        Args:
+            asin (str): Product ASIN.
+
+        Returns:
+            tuple: (Product Name, Price, Image URL) or None.
+        """
+        entry = self.cache.get(asin) if asin else None
+        if not entry or time.time() - entry["price_fetched_at"] > self.price_ttl:
+            return None
+        return entry["name"], entry["price"], entry["image_url"]
+
+    def get_static(self, asin):
+        """
+        Get the name and image even if the cached price has expired.
+
+        Args:
+            asin (str): Product ASIN.
+
+        Returns:
+            tuple: (Product Name, Image URL) or None.
+        """
+        entry = self.cache.get(asin) if asin else None
+        if not entry:
+            return None
+        return entry["name"], entry["image_url"]
+
+    def set(self, asin, product_name, price, image_url):
+        """
+        Store complete product details. Incomplete results are not cached.
+
+        Args:
+            asin (str): Product ASIN.
+            product_name (str): Product name.
+            price (str): Price text.
+            image_url (str): Verified image URL.
+        """
+        if not asin or product_name == "Unknown Product" or price == "N/A" or not image_url:
+            return
+        self.cache.set(asin, {
+            "name": product_name,
+            "price": price,
+            "image_url": image_url,
+            "price_fetched_at": time.time(),
+        })
+
+    def stats(self):
+        return self.cache.stats()
+
+
+product_cache = ProductDetailsCache(cache_path("products.json"))
+
+
+def get_cached_product_details(affiliate_link):
+    """
+    Look up product details for an affiliate link without any network access.
+
+    Only works once the link's redirect target is cached, since that is where
+    the ASIN comes from.
+
+    Args:
+        affiliate_link (str): The product's affiliate link.
+
+    Returns:
+        tuple: (Product Name, Price, Image URL) or None.
+    """
+    final_url = redirects.redirect_cache.get(affiliate_link)
+    return product_cache.get(extract_asin(final_url or affiliate_link))
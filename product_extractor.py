@@ -0,0 +1,602 @@
+import re
+import json
+from collections import Counter
+
+# Image data patterns in the page's image detail scripts, in priority order
+HIRES_PATTERN = re.compile(r'"hiRes":"(https://[^"]+)"')
+LARGE_PATTERN = re.compile(r'"large":"(https://[^"]+)"')
+SCRIPT_IMAGE_PATTERNS = [
+    (HIRES_PATTERN, 'hiRes'),
+    (LARGE_PATTERN, 'large'),
+    (re.compile(r'"mainImage":"(https://[^"]+)"'), 'mainImage')
+]
+
+# Elements holding the main product image, whose other sizes are good fallback candidates
+MAIN_IMAGE_IDS = {"landingImage", "imgBlkFront"}
+
+# Distinct script gallery images offered as fallbacks for the main image
+MAX_GALLERY_IMAGES = 5
+
+
+class StructuredData:
+    """
+    Script payloads of a product page, collected in a single pass over the document.
+
+    Attributes:
+        json_ld (list): Decoded application/ld+json payloads, in document order.
+        scripts (list): Text of every text/javascript script, in document order.
+    """
+
+    def __init__(self, json_ld, scripts):
+        self.json_ld = json_ld
+        self.scripts = scripts
+
+
+def collect_structured_data(soup):
+    """
+    Walk the script tags once, decoding every JSON-LD payload and keeping the JavaScript sources.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+
+    Returns:
+        StructuredData: The collected payloads.
+    """
+    json_ld = []
+    scripts = []
+    for script in soup.find_all("script"):
+        script_type = script.get("type")
+        if script_type == "application/ld+json":
+            try:
+                json_ld.append(json.loads(script.string))
+            except Exception as e:
+                print(f"Error parsing JSON-LD: {e}")
+        elif script_type == "text/javascript":
+            scripts.append(script.string if script.string else "")
+    return StructuredData(json_ld, scripts)
+
+
+class SelectorChain:
+    """
+    An ordered list of selector rules evaluated lazily.
+
+    Rules are tried one at a time and evaluation stops at the first rule whose
+    element yields a non-empty value, so the common case costs a single tree
+    traversal instead of one per rule. Each rule is a tuple of a BeautifulSoup
+    method name and its arguments, e.g. ("find", "span", {"id": "productTitle"})
+    or ("select_one", "#productTitle").
+    """
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = rules
+        self.match_counts = Counter()
+
+    @staticmethod
+    def describe(rule):
+        method, *args = rule
+        return f"{method}({', '.join(repr(arg) for arg in args)})"
+
+    def first(self, soup, extract):
+        """
+        Find the first rule that produces a value.
+
+        Args:
+            soup (BeautifulSoup): The parsed product page.
+            extract (callable): Turns a matched element into a value, returning
+                something falsy if the element should be skipped.
+
+        Returns:
+            tuple: (value, rule) for the first match, or (None, None).
+        """
+        for rule in self.rules:
+            method, *args = rule
+            element = getattr(soup, method)(*args)
+            if not element:
+                continue
+            value = extract(element)
+            if value:
+                self.match_counts[self.describe(rule)] += 1
+                print(f"Matched {self.name} rule: {self.describe(rule)}")
+                return value, rule
+        self.match_counts[None] += 1
+        return None, None
+
+
+NAME_SELECTORS = SelectorChain("name", [
+    ("find", "span", {"id": "productTitle"}),
+    ("find", "h1", {"id": "title"}),
+    ("find", "h1", {"class": "a-spacing-none"}),
+    ("select_one", "#productTitle"),
+    ("select_one", ".product-title-word-break"),
+    ("select_one", ".product-title"),
+    ("select_one", "h1.a-size-large"),
+    ("select_one", "h1"),
+])
+
+PRICE_SELECTORS = SelectorChain("price", [
+    ("find", "span", {"class": "a-price-whole"}),
+    ("find", "span", {"id": "priceblock_ourprice"}),
+    ("find", "span", {"class": "a-offscreen"}),
+    ("select_one", ".a-price .a-offscreen"),
+    ("select_one", "#corePriceDisplay_desktop_feature_div .a-price-whole"),
+    ("select_one", "#corePrice_feature_div .a-price-whole"),
+    ("select_one", ".a-price"),
+    ("select_one", "#price"),
+    ("select_one", ".price"),
+    ("select_one", "#corePrice_desktop .a-offscreen"),
+])
+
+IMAGE_SELECTORS = SelectorChain("image", [
+    ("find", "img", {"id": "landingImage"}),
+    ("find", "img", {"id": "imgBlkFront"}),
+    ("select_one", "#main-image-container img"),
+    ("select_one", "#imgTagWrapperId img"),
+    ("select_one", "#imageBlock_feature_div img"),
+    ("select_one", "#imageBlock img"),
+    ("select_one", "#main-image"),
+    ("select_one", ".a-dynamic-image"),
+    ("select_one", "#product-image"),
+    ("select_one", ".product-image img"),
+])
+
+
+def element_text(element):
+    return element.get_text(strip=True)
+
+
+def element_image_url(element):
+    """
+    Get an optimized image URL from the first image attribute present on an element.
+
+    Args:
+        element (Tag): An image element.
+
+    Returns:
+        str: Image URL, or None.
+    """
+    for attr in ["src", "data-old-hires", "data-a-dynamic-image"]:
+        if element.get(attr):
+            img_attr = element[attr]
+            if attr == "data-a-dynamic-image" and img_attr.startswith('{'):
+                try:
+                    image_dict = json.loads(img_attr)
+                    first_url = list(image_dict.keys())[0]
+                    return optimize_amazon_image_url(first_url)
+                except:
+                    return None
+            return optimize_amazon_image_url(img_attr)
+    return None
+
+
+def is_high_res(url):
+    """
+    Check if an image URL is likely high-resolution.
+
+    Args:
+        url (str): Image URL.
+
+    Returns:
+        bool: True if the URL contains a typical high-res indicator.
+    """
+    if not url:
+        return False
+    # Check for typical high-res indicators in the URL
+    high_res_indicators = ['_SL1500_', '_SL1200_', '_SL1000_', '_SX1500_', '_UL1500_',
+                          'large', 'hiRes', 'hires', 'XXL', 'high', 'original']
+    return any(indicator in url for indicator in high_res_indicators)
+
+
+def optimize_amazon_image_url(url):
+    """
+    Clean up an Amazon image URL to get the highest resolution.
+
+    Args:
+        url (str): Image URL.
+
+    Returns:
+        str: The optimized URL, or None if url is empty.
+    """
+    if not url:
+        return None
+
+    # Remove size constraints from URL to get highest resolution
+    # Pattern 1: Remove _SX... _SY... parameters
+    url = re.sub(r'_(SX|SY|UX|UY|AA|AB|AC|AD)\d+_', '_', url)
+
+    # Pattern 2: Replace small/medium size indicators with large
+    url = url.replace('_SR75,75_', '_SL1500_')
+    url = url.replace('_SR140,140_', '_SL1500_')
+    url = url.replace('_SR200,200_', '_SL1500_')
+    url = url.replace('_SL160_', '_SL1500_')
+    url = url.replace('_SL500_', '_SL1500_')
+
+    # Pattern 3: Handle URLs with ?_encoding=... parameters
+    if '?' in url:
+        url = url.split('?')[0]
+
+    return url
+
+
+def extract_product_name(soup, data):
+    """
+    Extract the product name, trying multiple selectors before JSON-LD.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+        data (StructuredData): Precollected script payloads.
+
+    Returns:
+        str: Product name, or "Unknown Product".
+    """
+    product_name, _ = NAME_SELECTORS.first(soup, element_text)
+
+    # If still no product name, try to find in JSON-LD
+    if not product_name or product_name == "Surprice Product with maximum discount":
+        for item in data.json_ld:
+            try:
+                if isinstance(item, dict) and "name" in item:
+                    product_name = item["name"]
+                    break
+                elif isinstance(item, list) and item and "name" in item[0]:
+                    product_name = item[0]["name"]
+                    break
+            except:
+                pass
+
+    return product_name if product_name else "Unknown Product"
+
+
+def extract_price(soup, data):
+    """
+    Extract the price, trying multiple selectors before JSON-LD offers.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+        data (StructuredData): Precollected script payloads.
+
+    Returns:
+        str: Price text, or "N/A".
+    """
+    price, _ = PRICE_SELECTORS.first(soup, element_text)
+
+    # If still no price, try to find in JSON-LD
+    if not price or price == "N/A":
+        for item in data.json_ld:
+            try:
+                if isinstance(item, dict) and "offers" in item:
+                    if isinstance(item["offers"], dict) and "price" in item["offers"]:
+                        price = item["offers"]["price"]
+                    elif isinstance(item["offers"], list) and item["offers"] and "price" in item["offers"][0]:
+                        price = item["offers"][0]["price"]
+                elif isinstance(item, list) and item and "offers" in item[0]:
+                    if isinstance(item[0]["offers"], dict) and "price" in item[0]["offers"]:
+                        price = item[0]["offers"]["price"]
+                    elif isinstance(item[0]["offers"], list) and item[0]["offers"] and "price" in item[0]["offers"][0]:
+                        price = item[0]["offers"][0]["price"]
+            except:
+                pass
+
+    return price if price else "N/A"
+
+
+def find_script_image(scripts):
+    """
+    Find a high-resolution image in the page's image detail scripts.
+
+    Args:
+        scripts (list): Text of the page's text/javascript scripts, in document order.
+
+    Returns:
+        str: Optimized image URL, or None if no script has one.
+    """
+    image_url = None
+    hd_image_found = False
+
+    for script_text in scripts:
+        # Look for specific image data patterns
+        for pattern, img_type in SCRIPT_IMAGE_PATTERNS:
+            matches = pattern.findall(script_text)
+            if matches:
+                for match in matches:
+                    candidate_url = match.replace('\\', '')
+                    if is_high_res(candidate_url):
+                        image_url = optimize_amazon_image_url(candidate_url)
+                        print(f"Found high-resolution {img_type} image: {image_url}")
+                        hd_image_found = True
+                        break
+            if hd_image_found:
+                break
+
+        # Alternative approach: Look for image JSON data
+        if not hd_image_found and "'colorImages'" in script_text:
+            try:
+                start_idx = script_text.find("'colorImages'") + len("'colorImages'") + 1
+                end_idx = script_text.find("'colorToAsin'")
+                if end_idx == -1:
+                    end_idx = script_text.find("'heroImage'")
+                if end_idx == -1:
+                    end_idx = start_idx + 2000
+
+                image_data = script_text[start_idx:end_idx].strip()
+
+                # Search for high-resolution image URLs
+                hiRes_match = HIRES_PATTERN.search(image_data)
+                large_match = LARGE_PATTERN.search(image_data)
+
+                if hiRes_match:
+                    image_url = optimize_amazon_image_url(hiRes_match.group(1).replace('\\', ''))
+                    print(f"Found hiRes image in colorImages: {image_url}")
+                    hd_image_found = True
+                elif large_match:
+                    image_url = optimize_amazon_image_url(large_match.group(1).replace('\\', ''))
+                    print(f"Found large image in colorImages: {image_url}")
+                    hd_image_found = True
+            except Exception as e:
+                print(f"Error parsing image data from script: {e}")
+
+    return image_url
+
+
+def absolute_image_url(image_url):
+    """
+    Ensure the image URL is absolute.
+
+    Args:
+        image_url (str): Image URL, possibly protocol or host relative.
+
+    Returns:
+        str: Absolute URL, or None if image_url is empty.
+    """
+    if image_url and not image_url.startswith('http'):
+        image_url = "https:" + image_url if image_url.startswith('//') else f"https://www.amazon.com{image_url}"
+    return image_url
+
+
+def script_image_alternatives(scripts):
+    """
+    Find the first high-resolution image of each kind in the page's image detail scripts.
+
+    Args:
+        scripts (list): Text of the page's text/javascript scripts, in document order.
+
+    Returns:
+        list: Optimized hiRes, large and mainImage URLs, those found.
+    """
+    candidates = []
+    for pattern, _ in SCRIPT_IMAGE_PATTERNS:
+        high_res_urls = (
+            match.replace('\\', '')
+            for script_text in scripts
+            for match in pattern.findall(script_text)
+        )
+        candidate_url = next((url for url in high_res_urls if is_high_res(url)), None)
+        if candidate_url:
+            candidates.append(optimize_amazon_image_url(candidate_url))
+    return candidates
+
+
+def script_gallery_images(scripts, limit=MAX_GALLERY_IMAGES):
+    """
+    Collect distinct high-resolution gallery images from the page's image detail scripts.
+
+    The main image usually appears under every key in the same resolution, so
+    these fill the candidate list with other product images that can stand in
+    when the main one fails to load.
+
+    Args:
+        scripts (list): Text of the page's text/javascript scripts, in document order.
+        limit (int): Maximum number of images returned.
+
+    Returns:
+        list: Optimized image URLs, hiRes ones first, each in document order.
+    """
+    images = []
+    for pattern, _ in SCRIPT_IMAGE_PATTERNS:
+        for script_text in scripts:
+            for match in pattern.findall(script_text):
+                candidate_url = match.replace('\\', '')
+                if not is_high_res(candidate_url):
+                    continue
+                candidate_url = optimize_amazon_image_url(candidate_url)
+                if candidate_url not in images:
+                    images.append(candidate_url)
+                    if len(images) >= limit:
+                        return images
+    return images
+
+
+def script_image_candidates(scripts):
+    """
+    Rank the high-resolution images in the page's image detail scripts.
+
+    Args:
+        scripts (list): Text of the page's text/javascript scripts, in document order.
+
+    Returns:
+        list: Optimized image URLs, find_script_image's choice first, then the
+        first high-resolution hiRes, large and mainImage URLs.
+    """
+    return [find_script_image(scripts)] + script_image_alternatives(scripts)
+
+
+def unique_image_urls(candidates):
+    """
+    Args:
+        candidates (list): Image URLs, best first, possibly relative, empty or repeated.
+
+    Returns:
+        list: Unique absolute image URLs in the same order.
+    """
+    unique_candidates = []
+    for image_url in candidates:
+        image_url = absolute_image_url(image_url)
+        if image_url and image_url not in unique_candidates:
+            unique_candidates.append(image_url)
+    return unique_candidates
+
+
+def dynamic_image_candidates(soup):
+    """
+    Rank the images listed in data-a-dynamic-image attributes.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+
+    Returns:
+        list: Optimized image URLs. The largest image of the last element with
+        one comes first, then the main product image's sizes, largest first.
+        Empty if no element lists an image.
+    """
+    best_url = None
+    main_image_urls = []
+    for img in soup.select("[data-a-dynamic-image]"):
+        dynamic_attr = img.get('data-a-dynamic-image')
+        if dynamic_attr and dynamic_attr.startswith('{'):
+            try:
+                image_dict = json.loads(dynamic_attr)
+                # Get the URL with the highest resolution by comparing dimensions
+                sized_urls = []
+                for url, dimensions in image_dict.items():
+                    if isinstance(dimensions, list) and len(dimensions) >= 2:
+                        sized_urls.append((dimensions[0] * dimensions[1], url))  # width * height
+
+                if sized_urls:
+                    best_size, best_url = max(sized_urls, key=lambda item: item[0])
+                    print(f"Found highest resolution dynamic image: {optimize_amazon_image_url(best_url)} ({best_size} pixels)")
+                    if img.get('id') in MAIN_IMAGE_IDS:
+                        main_image_urls = [url for _, url in sorted(sized_urls, key=lambda item: item[0], reverse=True)]
+            except Exception as e:
+                print(f"Error parsing dynamic image data: {e}")
+
+    if not best_url:
+        return []
+    return [optimize_amazon_image_url(url) for url in [best_url] + main_image_urls]
+
+
+def json_ld_image_candidates(data):
+    """
+    Rank the images of the first JSON-LD item that has any.
+
+    Args:
+        data (StructuredData): Precollected script payloads.
+
+    Returns:
+        list: Optimized image URLs, the first high-resolution one first.
+    """
+    for item in data.json_ld:
+        try:
+            if isinstance(item, dict) and "image" in item:
+                img_data = item["image"]
+                if isinstance(img_data, str):
+                    return [optimize_amazon_image_url(img_data)]
+                if isinstance(img_data, list) and img_data:
+                    # The highest resolution image first, otherwise keep the page's order
+                    ranked = sorted(img_data, key=lambda img: not is_high_res(img))
+                    return [optimize_amazon_image_url(img) for img in ranked]
+                return []
+        except Exception as e:
+            print(f"Error parsing JSON-LD: {e}")
+    return []
+
+
+def extract_image_candidates(soup, data):
+    """
+    Collect every product image candidate, best first.
+
+    Sources are ranked by how likely they are to hold the high-resolution main
+    image: image detail scripts, data-zoom-hires, data-old-hires,
+    data-a-dynamic-image, JSON-LD and finally the standard image selectors.
+    The first candidate is the image extract_image_url returns.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+        data (StructuredData): Precollected script payloads.
+
+    Returns:
+        list: Unique absolute image URLs, possibly empty.
+    """
+    candidates = []
+
+    # 1. Image detail scripts which often have multiple resolutions
+    print("Searching for high-resolution images in scripts...")
+    candidates.extend(script_image_candidates(data.scripts))
+
+    # 2. data-zoom-hires attributes which typically have high-res images
+    print("Searching for data-zoom-hires attributes...")
+    candidates.extend(optimize_amazon_image_url(img.get('data-zoom-hires')) for img in soup.select("[data-zoom-hires]"))
+
+    # 3. data-old-hires attributes
+    print("Searching for data-old-hires attributes...")
+    candidates.extend(optimize_amazon_image_url(img.get('data-old-hires')) for img in soup.select("[data-old-hires]"))
+
+    # 4. data-a-dynamic-image which contains multiple resolutions
+    print("Searching for data-a-dynamic-image attributes...")
+    dynamic_candidates = dynamic_image_candidates(soup)
+    # The last element with a dynamic image may be a carousel item, only lead with it if nothing better was found
+    candidates.extend(dynamic_candidates if not any(candidates) else dynamic_candidates[1:])
+
+    # 5. JSON-LD which sometimes contains high-res images
+    print("Searching for images in JSON-LD...")
+    candidates.extend(json_ld_image_candidates(data))
+
+    # 6. Standard image selectors, only evaluated if nothing better was found
+    if not any(candidates):
+        print("Falling back to standard image selectors...")
+        image_url, _ = IMAGE_SELECTORS.first(soup, element_image_url)
+        candidates.append(image_url)
+
+    unique_candidates = unique_image_urls(candidates)
+    if unique_candidates:
+        print(f"Found {len(unique_candidates)} image candidate(s), best: {unique_candidates[0]}")
+    return unique_candidates
+
+
+def extract_image_url(soup, data):
+    """
+    Extract the highest resolution product image available.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+        data (StructuredData): Precollected script payloads.
+
+    Returns:
+        str: Absolute image URL, or None if no image was found.
+    """
+    candidates = extract_image_candidates(soup, data)
+    return candidates[0] if candidates else None
+
+
+def extract_product_candidates(soup):
+    """
+    Extract product name, price and every image candidate from a parsed product page.
+
+    The script tags are walked and decoded once and shared by all three resolvers.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+
+    Returns:
+        tuple: (Product Name, Price, Image candidates). Missing fields are
+        "Unknown Product", "N/A" and an empty list respectively.
+    """
+    data = collect_structured_data(soup)
+    product_name = extract_product_name(soup, data)
+    price = extract_price(soup, data)
+    image_candidates = extract_image_candidates(soup, data)
+    return product_name, price, image_candidates
+
+
+def extract_product_details(soup):
+    """
+    Extract product name, price and image from a parsed product page.
+
+    Args:
+        soup (BeautifulSoup): The parsed product page.
+
+    Returns:
+        tuple: (Product Name, Price, Image URL). Missing fields are
+        "Unknown Product", "N/A" and None respectively.
+    """
+    product_name, price, image_candidates = extract_product_candidates(soup)
+    return product_name, price, image_candidates[0] if image_candidates else None
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+
+# Sustained requests per second and burst size per host. Hosts not listed use DEFAULT_RATE_LIMIT.
+HOST_RATE_LIMITS = {
+    "amzn.to": (0.5, 2),
+    "www.amazon.in": (0.5, 2),
+    "www.amazon.com": (0.5, 2),
+    "m.media-amazon.com": (5.0, 10),
+    "images-na.ssl-images-amazon.com": (5.0, 10),
+    "graph.facebook.com": (1.0, 2),
+}
+
+DEFAULT_RATE_LIMIT = (2.0, 4)
+
+
+def parse_rate_limits(value):
+    """
+    Parse rate limit overrides of the form "host=rate:burst,host=rate:burst".
+
+    Args:
+        value (str): Overrides, e.g. "www.amazon.in=0.25:1,graph.facebook.com=2:4".
+
+    Returns:
+        dict: host -> (rate, burst).
+    """
+    limits = {}
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            host, spec = item.split('=', 1)
+            rate, burst = spec.split(':', 1)
+            limits[host.strip().lower()] = (float(rate), int(burst))
+        except ValueError:
+            print(f"Ignoring invalid rate limit: {item}")
+    return limits
+
+
+HOST_RATE_LIMITS.update(parse_rate_limits(os.environ.get("RATE_LIMITS", "")))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill at `rate` per second up to `burst`. A caller that finds the
+    bucket empty reserves its token anyway and sleeps until it would have been
+    available, so concurrent callers are served in order without busy waiting.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens, blocking until they are available.
+
+        Args:
+            tokens (int): Number of tokens to take.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_lock = threading.Lock()
+_buckets = {}
+
+
+def get_bucket(host):
+    """
+    Get the token bucket for a host, creating it from HOST_RATE_LIMITS on first use.
+
+    Args:
+        host (str): Host name, optionally with a port.
+
+    Returns:
+        TokenBucket: The host's bucket.
+    """
+    host = host.lower()
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, burst = HOST_RATE_LIMITS.get(host.split(':')[0], DEFAULT_RATE_LIMIT)
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+
+def acquire(host):
+    """
+    Wait for permission to send one request to a host.
+
+    Args:
+        host (str): Host name, optionally with a port.
+
+    Returns:
+        float: Seconds spent waiting.
+    """
+    return get_bucket(host).acquire()
+
+
+def stats():
+    """
+    Returns:
+        dict: host -> {"waits", "wait_seconds"}.
+    """
+    with _lock:
+        return {
+            host: {"waits": bucket.waits, "wait_seconds": bucket.wait_seconds}
+            for host, bucket in _buckets.items()
+        }
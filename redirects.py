@@ -0,0 +1,222 @@
+import time
+import threading
+
+import requests
+
+from cache import PersistentCache, cache_path
+import product_cache
+import block_detector
+
+REDIRECT_STATUS_CODES = [301, 302, 303, 307, 308]
+
+# Affiliate short link hosts, whose links only ever redirect
+SHORT_LINK_HOSTS = {"amzn.to", "amzn.in", "amzn.eu", "amzn.asia", "a.co"}
+
+# Affiliate short links rarely change their target, so cache them for a week
+REDIRECT_CACHE_TTL = 7 * 24 * 3600
+REDIRECT_CACHE_MAX_ENTRIES = 5000
+
+redirect_cache = PersistentCache(cache_path("redirects.json"), REDIRECT_CACHE_TTL, REDIRECT_CACHE_MAX_ENTRIES)
+
+# Hosts that answered HEAD with an error but GET without one
+_head_rejecting_hosts = set()
+
+
+class RedirectStats:
+    """
+    Counters for redirect resolution: hops, their latency, and body bytes not downloaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hops = 0
+        self.head_requests = 0
+        self.get_fallbacks = 0
+        self.seconds = 0.0
+        self.bytes_saved = 0
+
+    def record_hop(self, method, seconds, bytes_saved):
+        with self._lock:
+            self.hops += 1
+            if method == "HEAD":
+                self.head_requests += 1
+            else:
+                self.get_fallbacks += 1
+            self.seconds += seconds
+            self.bytes_saved += bytes_saved
+
+    def summary(self):
+        """
+        Returns:
+            dict: Hop counts, average hop latency in seconds and bytes saved.
+        """
+        with self._lock:
+            return {
+                "hops": self.hops,
+                "head_requests": self.head_requests,
+                "get_fallbacks": self.get_fallbacks,
+                "avg_hop_seconds": self.seconds / self.hops if self.hops else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+stats = RedirectStats()
+
+
+def _content_length(response):
+    content_length = response.headers.get('Content-Length', '')
+    return int(content_length) if content_length.isdigit() else 0
+
+
+def fetch_hop(session, url, headers):
+    """
+    Request a single redirect hop without downloading its body.
+
+    Uses HEAD, falling back to a GET that is closed before its body is read for
+    hosts that reject HEAD.
+
+    Args:
+        session (requests.Session): Session used for the request.
+        url (str): URL of the hop.
+        headers (dict): Request headers.
+
+    Returns:
+        requests.Response: The closed response, only status and headers are usable.
+    """
+    host = requests.utils.urlparse(url).netloc
+    started = time.perf_counter()
+
+    if host not in _head_rejecting_hosts:
+        response = session.head(url, headers=headers, allow_redirects=False, timeout=20)
+        if response.status_code < 400:
+            seconds = time.perf_counter() - started
+            stats.record_hop("HEAD", seconds, _content_length(response))
+            print(f"HEAD {url} -> {response.status_code} ({seconds * 1000:.0f} ms)")
+            return response
+
+    response = session.get(url, headers=headers, allow_redirects=False, timeout=20, stream=True)
+    response.close()
+    seconds = time.perf_counter() - started
+    if response.status_code < 400 and host not in _head_rejecting_hosts:
+        print(f"Host {host} rejects HEAD, using GET for its redirects")
+        _head_rejecting_hosts.add(host)
+    stats.record_hop("GET", seconds, _content_length(response))
+    print(f"GET {url} -> {response.status_code} ({seconds * 1000:.0f} ms)")
+    return response
+
+
+def is_product_url(url):
+    """
+    Args:
+        url (str): Any URL.
+
+    Returns:
+        bool: True if the URL is a product page with an ASIN rather than a short link.
+    """
+    host = requests.utils.urlparse(url).netloc.lower()
+    return host not in SHORT_LINK_HOSTS and product_cache.extract_asin(url) is not None
+
+
+def resolve_affiliate_link(session, affiliate_link, headers, max_redirects=9):
+    """
+    Follow the redirect chain of an affiliate short link to the final product URL.
+
+    Resolving stops at the first product URL, which the scraper fetches
+    itself, so the product page is never requested twice, and at the first hop
+    whose host is paused after block pages. Chains that ended on
+    a 2xx page are cached, so a link that comes round again in the rotation
+    skips every hop and its delays. Hops never download a body.
+
+    Args:
+        session (requests.Session): Session used for the redirect requests.
+        affiliate_link (str): The product's affiliate link.
+        headers (dict): Request headers.
+        max_redirects (int): Maximum number of redirects to follow.
+
+    Returns:
+        tuple: (final_url, from_cache) where final_url is the URL after redirects
+        and from_cache is True if it was cached before this call.
+    """
+    cached_url = redirect_cache.get(affiliate_link)
+    if cached_url:
+        print(f"Using cached redirect target: {cached_url}")
+        return cached_url, True
+
+    if is_product_url(affiliate_link):
+        return affiliate_link, False
+
+    if block_detector.is_paused(requests.utils.urlparse(affiliate_link).netloc):
+        return affiliate_link, False
+
+    # First get the redirect URL without following
+    print(f"Fetching initial URL: {affiliate_link}")
+    initial_response = fetch_hop(session, affiliate_link, headers)
+
+    # Handle redirects manually to better track the path
+    final_url = affiliate_link
+    redirect_count = 0
+    resolved = True
+
+    while (initial_response.status_code in REDIRECT_STATUS_CODES) and redirect_count < max_redirects:
+        redirect_url = initial_response.headers.get('Location')
+        if not redirect_url:
+            break
+
+        print(f"Redirect #{redirect_count + 1}: {redirect_url}")
+
+        # If it's a relative URL, make it absolute
+        if redirect_url.startswith('/'):
+            parsed_url = requests.utils.urlparse(final_url)
+            redirect_url = f"{parsed_url.scheme}://{parsed_url.netloc}{redirect_url}"
+
+        final_url = redirect_url
+        redirect_count += 1
+
+        # The product page is fetched by the scraper, probing it here would request it twice
+        if is_product_url(redirect_url):
+            break
+
+        # Leave a host paused by its circuit breaker alone, the scraper then stops at the same check
+        if block_detector.is_paused(requests.utils.urlparse(redirect_url).netloc):
+            resolved = False
+            break
+
+        # Follow the redirect
+        try:
+            initial_response = fetch_hop(session, redirect_url, headers)
+        except requests.exceptions.RequestException as e:
+            print(f"Error during redirect {redirect_count}: {e}")
+            resolved = False
+            break
+
+    # Only cache chains that ended on a real page, not on an error page such as a 404 or a 503.
+    # Chains stopped at a product URL are remembered by the scraper once the page has loaded.
+    if resolved and redirect_count and not is_product_url(final_url) and initial_response.status_code < 300:
+        redirect_cache.set(affiliate_link, final_url)
+
+    return final_url, False
+
+
+def remember_affiliate_link(affiliate_link, final_url):
+    """
+    Cache a redirect target once its product page has loaded.
+
+    Args:
+        affiliate_link (str): The product's affiliate link.
+        final_url (str): The product URL it resolved to.
+    """
+    if final_url != affiliate_link:
+        redirect_cache.set(affiliate_link, final_url)
+
+
+def forget_affiliate_link(affiliate_link):
+    """
+    Drop a cached redirect target, e.g. after the cached product page failed to load.
+
+    Args:
+        affiliate_link (str): The product's affiliate link.
+
+    Returns:
+        bool: True if a cached target was dropped.
+    """
+    return redirect_cache.delete(affiliate_link)
@@ -0,0 +1,155 @@
+import time
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Outcome classes
+PERMANENT = "permanent"  # Retrying cannot help, e.g. a dead link
+THROTTLED = "throttled"  # The host asked us to slow down
+TRANSIENT = "transient"  # Worth retrying after a short backoff
+
+PERMANENT_STATUS_CODES = {400, 401, 404, 405, 410, 451}
+THROTTLED_STATUS_CODES = {429, 503}
+
+# Backoff for transient failures: full jitter over base * 2^attempt, capped at MAX_DELAY
+BASE_DELAY = 2.0
+# Throttling backs off from a higher base
+THROTTLE_BASE_DELAY = 10.0
+MAX_DELAY = 60.0
+
+# Total seconds a single call may spend sleeping between retries
+TOTAL_RETRY_BUDGET = 120.0
+
+
+def classify_status(status_code):
+    """
+    Classify an HTTP status code.
+
+    Args:
+        status_code (int): Response status code.
+
+    Returns:
+        str: PERMANENT, THROTTLED or TRANSIENT.
+    """
+    if status_code in THROTTLED_STATUS_CODES:
+        return THROTTLED
+    if status_code in PERMANENT_STATUS_CODES:
+        return PERMANENT
+    return TRANSIENT
+
+
+def classify_exception(error):
+    """
+    Classify an exception raised while fetching or parsing a page.
+
+    Args:
+        error (Exception): The exception.
+
+    Returns:
+        str: PERMANENT or TRANSIENT.
+    """
+    if isinstance(error, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                          requests.exceptions.InvalidSchema)):
+        return PERMANENT
+    return TRANSIENT
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given in seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Retry:
+    """
+    Retry state for one operation: attempts made and backoff time spent.
+
+    Usage:
+        retry = Retry(max_attempts=5)
+        while retry.attempts_left():
+            ...
+            if not retry.wait(classify_status(response.status_code), response.headers.get("Retry-After")):
+                break
+    """
+
+    def __init__(self, max_attempts, total_budget=TOTAL_RETRY_BUDGET):
+        self.max_attempts = max_attempts
+        self.total_budget = total_budget
+        self.attempt = 1
+        self.slept = 0.0
+
+    def attempts_left(self):
+        return self.attempt <= self.max_attempts
+
+    def backoff(self, outcome, retry_after=None):
+        """
+        Compute the delay before the next attempt.
+
+        Args:
+            outcome (str): Class of the failure that just happened.
+            retry_after (str, optional): Retry-After header of the failed response.
+
+        Returns:
+            float: Seconds to wait, or None if the operation should give up.
+        """
+        if outcome == PERMANENT or self.attempt >= self.max_attempts:
+            return None
+
+        base = THROTTLE_BASE_DELAY if outcome == THROTTLED else BASE_DELAY
+        delay = random.uniform(0, min(MAX_DELAY, base * 2 ** (self.attempt - 1)))
+        if outcome == THROTTLED:
+            # Never come back sooner than the host asked, but at least half the backoff
+            delay = max(delay, base / 2)
+            requested = parse_retry_after(retry_after)
+            if requested is not None:
+                delay = max(delay, requested)
+
+        if self.slept + delay > self.total_budget:
+            return None
+        return delay
+
+    def wait(self, outcome, retry_after=None):
+        """
+        Record a failed attempt and sleep before the next one.
+
+        Args:
+            outcome (str): Class of the failure that just happened.
+            retry_after (str, optional): Retry-After header of the failed response.
+
+        Returns:
+            bool: True if the operation should try again, False to give up.
+        """
+        delay = self.backoff(outcome, retry_after)
+        if delay is None:
+            if outcome == PERMANENT:
+                print("Permanent failure, not retrying")
+            else:
+                print(f"Retry budget exhausted after {self.attempt} attempts and {self.slept:.1f}s of backoff")
+            self.attempt = self.max_attempts + 1
+            return False
+
+        print(f"{outcome.capitalize()} failure on attempt {self.attempt}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+        self.slept += delay
+        self.attempt += 1
+        return True
@@ -0,0 +1,122 @@
+import os
+import csv
+import json
+
+import openpyxl
+import pandas as pd
+
+
+def iter_xlsx_rows(path):
+    """
+    Stream the rows of the first sheet of a workbook opened in read-only mode.
+
+    Args:
+        path (str): Path to the .xlsx workbook.
+
+    Yields:
+        tuple: Cell values of each row after the header row.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for values in workbook.worksheets[0].iter_rows(min_row=2, values_only=True):
+            yield values
+    finally:
+        workbook.close()
+
+
+def iter_excel_rows(path):
+    """
+    Read the first sheet of a legacy .xls or an .ods workbook through pandas.
+
+    These formats can not be streamed, so the sheet is loaded as a whole.
+
+    Args:
+        path (str): Path to the workbook.
+
+    Yields:
+        tuple: Cell values of each row after the header row.
+    """
+    df = pd.read_excel(path)
+    df = df.astype(object).where(df.notna(), None)
+    for values in df.itertuples(index=False, name=None):
+        yield values
+
+
+def iter_csv_rows(path):
+    """
+    Stream the rows of a CSV file, empty cells are read as None.
+
+    Args:
+        path (str): Path to the .csv file.
+
+    Yields:
+        tuple: Cell values of each row after the header row.
+    """
+    with open(path, 'r', encoding="utf-8-sig", newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for values in reader:
+            yield tuple(value if value != '' else None for value in values)
+
+
+def iter_jsonl_rows(path):
+    """
+    Stream the records of a JSON Lines file, each a JSON array or object.
+
+    Args:
+        path (str): Path to the .jsonl file.
+
+    Yields:
+        tuple: Values of each record, objects in key order.
+    """
+    with open(path, 'r', encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            values = record.values() if isinstance(record, dict) else record
+            yield tuple(values)
+
+
+# Row source per file extension
+ROW_SOURCES = {
+    ".xlsx": iter_xlsx_rows,
+    ".xlsm": iter_xlsx_rows,
+    ".xls": iter_excel_rows,
+    ".ods": iter_excel_rows,
+    ".csv": iter_csv_rows,
+    ".jsonl": iter_jsonl_rows,
+}
+
+
+def iter_rows(path, columns=1):
+    """
+    Stream the data rows of a content source, picking the backend from the file extension.
+
+    Rows are cut or padded to `columns` values. Trailing rows with no value in
+    any column are dropped, as pd.read_excel does, while empty rows between
+    data rows are kept so row numbers still match the sheet.
+
+    Args:
+        path (str): Path to an .xlsx, .xlsm, .xls, .ods, .csv or .jsonl file.
+        columns (int): Number of leading columns read.
+
+    Yields:
+        tuple: `columns` cell values per row.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    row_source = ROW_SOURCES.get(extension)
+    if row_source is None:
+        raise ValueError(f"Unsupported content source: {path}")
+
+    empty_rows = 0
+    for values in row_source(path):
+        if all(value is None for value in values):
+            # Held back until a data row follows
+            empty_rows += 1
+            continue
+        for _ in range(empty_rows):
+            yield (None,) * columns
+        empty_rows = 0
+        yield tuple(values[:columns]) + (None,) * (columns - len(values))
@@ -0,0 +1,239 @@
+import os
+import sys
+import time
+import signal
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+# Import the posting scripts once so pandas, BeautifulSoup, requests and pytz
+# stay loaded for the lifetime of the process instead of once per cron run.
+import market_place
+import we_love_amazon
+import job
+import http_client
+import fast_extractor
+import page_parser
+import redirects
+import rate_limiter
+import block_detector
+import image_verifier
+
+# Seconds a run may start late before it is treated as missed and skipped
+MISFIRE_GRACE_SECONDS = int(os.environ.get("SCHEDULER_MISFIRE_GRACE", "120"))
+
+# How often the scheduler loop wakes up to check for due jobs
+POLL_INTERVAL_SECONDS = 1.0
+
+
+class ScheduledJob:
+    """
+    A job that runs a script's main() at fixed minutes of every hour.
+
+    Mirrors the old crontab entries, e.g. "*/15 * * * *" becomes
+    minutes=(0, 15, 30, 45) and "10 * * * *" becomes minutes=(10,).
+    """
+
+    def __init__(self, name, func, minutes):
+        self.name = name
+        self.func = func
+        self.minutes = tuple(sorted(set(minutes)))
+        self.next_run = None
+        self.lock = threading.Lock()
+        self.thread = None
+
+        # Wall time statistics
+        self.run_count = 0
+        self.skipped_overlap = 0
+        self.skipped_misfire = 0
+        self.failures = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def compute_next_run(self, after):
+        """
+        Find the first scheduled minute strictly after the given time.
+
+        Args:
+            after (datetime): Reference time.
+
+        Returns:
+            datetime: The next time this job is due.
+        """
+        candidate = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # At most one hour of minutes needs to be checked
+        for _ in range(61):
+            if candidate.minute in self.minutes:
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"Job {self.name} has no valid minutes: {self.minutes}")
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        """Run the job once, recording its wall time."""
+        if not self.lock.acquire(blocking=False):
+            self.skipped_overlap += 1
+            print(f"[scheduler] {self.name} is still running, skipping this run")
+            return
+
+        started = time.perf_counter()
+        print(f"[scheduler] {self.name} started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            self.func()
+        except Exception as e:
+            self.failures += 1
+            print(f"[scheduler] {self.name} failed: {e}")
+            traceback.print_exc()
+        finally:
+            duration = time.perf_counter() - started
+            self.run_count += 1
+            self.last_duration = duration
+            self.max_duration = max(self.max_duration, duration)
+            self.total_duration += duration
+            self.lock.release()
+            print(f"[scheduler] {self.name} finished in {duration:.2f}s "
+                  f"(runs: {self.run_count}, avg: {self.total_duration / self.run_count:.2f}s, "
+                  f"max: {self.max_duration:.2f}s)")
+
+    def stats(self):
+        """
+        Get wall time statistics for this job.
+
+        Returns:
+            dict: Run counts and durations in seconds.
+        """
+        return {
+            "runs": self.run_count,
+            "failures": self.failures,
+            "skipped_overlap": self.skipped_overlap,
+            "skipped_misfire": self.skipped_misfire,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.run_count if self.run_count else None,
+            "max_duration": self.max_duration,
+        }
+
+
+class Scheduler:
+    """
+    Resident scheduler that replaces the per-run cron interpreter launches.
+
+    Each job runs in its own thread so a slow scrape does not delay the other
+    jobs, and a job is never started while its previous run is still active.
+    Runs that start later than MISFIRE_GRACE_SECONDS are skipped, and several
+    missed runs are coalesced into the next scheduled one.
+    """
+
+    def __init__(self, jobs, misfire_grace=MISFIRE_GRACE_SECONDS):
+        self.jobs = jobs
+        self.misfire_grace = misfire_grace
+        self.stop_event = threading.Event()
+
+    def start_job(self, scheduled_job):
+        if scheduled_job.is_running():
+            scheduled_job.skipped_overlap += 1
+            print(f"[scheduler] {scheduled_job.name} is still running, skipping this run")
+            return
+        scheduled_job.thread = threading.Thread(
+            target=scheduled_job.run,
+            name=scheduled_job.name,
+            daemon=True
+        )
+        scheduled_job.thread.start()
+
+    def run_pending(self, now):
+        """
+        Start every job that is due at the given time.
+
+        Args:
+            now (datetime): Current time.
+        """
+        for scheduled_job in self.jobs:
+            if scheduled_job.next_run is None:
+                scheduled_job.next_run = scheduled_job.compute_next_run(now)
+                print(f"[scheduler] {scheduled_job.name} next run at {scheduled_job.next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                continue
+
+            if now < scheduled_job.next_run:
+                continue
+
+            lateness = (now - scheduled_job.next_run).total_seconds()
+            if lateness > self.misfire_grace:
+                scheduled_job.skipped_misfire += 1
+                print(f"[scheduler] {scheduled_job.name} missed its run at "
+                      f"{scheduled_job.next_run.strftime('%Y-%m-%d %H:%M:%S')} by {lateness:.0f}s, skipping")
+            else:
+                self.start_job(scheduled_job)
+
+            # Coalesce any runs missed while we were busy into the next slot
+            scheduled_job.next_run = scheduled_job.compute_next_run(now)
+
+    def run_forever(self):
+        print(f"Scheduler started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        for scheduled_job in self.jobs:
+            print(f"[scheduler] Registered {scheduled_job.name} at minutes {list(scheduled_job.minutes)}")
+
+        while not self.stop_event.is_set():
+            self.run_pending(datetime.now())
+            self.stop_event.wait(POLL_INTERVAL_SECONDS)
+
+        print("Scheduler stopping, waiting for running jobs to finish...")
+        for scheduled_job in self.jobs:
+            if scheduled_job.is_running():
+                scheduled_job.thread.join()
+        self.print_stats()
+        print(f"Scheduler stopped at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def print_stats(self):
+        for scheduled_job in self.jobs:
+            print(f"[scheduler] {scheduled_job.name} stats: {scheduled_job.stats()}")
+        http_client.print_pool_stats()
+        print(f"[scheduler] Fast path stats: {fast_extractor.stats.summary()}")
+        print(f"[scheduler] Page decoding stats: {page_parser.decode_stats.summary()}")
+        print(f"[scheduler] Redirect stats: {redirects.stats.summary()}")
+        print(f"[scheduler] Rate limiter waits: {rate_limiter.stats()}")
+        print(f"[scheduler] Block page breakers: {block_detector.stats()}")
+        print(f"[scheduler] Image check cache: {image_verifier.image_check_cache.stats()}")
+
+
+def build_jobs():
+    """
+    Create the jobs that used to live in the Dockerfile crontab.
+
+    Returns:
+        list: ScheduledJob instances.
+    """
+    return [
+        ScheduledJob("market_place", market_place.main, range(0, 60, 15)),  # */15 * * * *
+        ScheduledJob("we_love_amazon", we_love_amazon.main, range(0, 60, 10)),  # */10 * * * *
+        ScheduledJob("job", job.main, [10]),  # 10 * * * *
+        # Scrapes the whole fb.xlsx in a batch so the posting runs are served from the product cache
+        ScheduledJob("prescrape", market_place.warm_product_cache, [5]),  # 5 * * * *
+    ]
+
+
+def main():
+    jobs = build_jobs()
+
+    # Allow a single job to be run immediately, e.g. `python scheduler.py job`
+    if len(sys.argv) > 1:
+        jobs_by_name = {scheduled_job.name: scheduled_job for scheduled_job in jobs}
+        for name in sys.argv[1:]:
+            if name not in jobs_by_name:
+                print(f"Unknown job: {name}. Available jobs: {', '.join(jobs_by_name)}")
+                sys.exit(1)
+            jobs_by_name[name].run()
+        return
+
+    scheduler = Scheduler(jobs)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run_forever()
+
+if __name__ == "__main__":
+    main()
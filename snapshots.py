@@ -0,0 +1,128 @@
+import os
+import glob
+import gzip
+import random
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Which pages to keep for troubleshooting: "failures", "all" or "off"
+DEBUG_SNAPSHOT_MODE = os.environ.get("DEBUG_SNAPSHOT_MODE", "failures")
+
+# Fraction of successful pages also kept in "failures" mode
+DEBUG_SNAPSHOT_SAMPLE_RATE = float(os.environ.get("DEBUG_SNAPSHOT_SAMPLE_RATE", "0.01"))
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "debug_snapshots")
+
+# Oldest snapshots are evicted once the store grows past this size
+SNAPSHOT_MAX_BYTES = int(os.environ.get("SNAPSHOT_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+_lock = threading.Lock()
+
+
+def should_capture(failed):
+    """
+    Decide whether a fetched page should be kept.
+
+    Args:
+        failed (bool): True if the page did not yield complete product details.
+
+    Returns:
+        bool: True if the page should be written to the snapshot store.
+    """
+    if DEBUG_SNAPSHOT_MODE == "off":
+        return False
+    if DEBUG_SNAPSHOT_MODE == "all" or failed:
+        return True
+    return random.random() < DEBUG_SNAPSHOT_SAMPLE_RATE
+
+
+def capture(content, asin=None, failed=False):
+    """
+    Queue a page for the snapshot store without blocking the caller.
+
+    Args:
+        content (bytes): Raw page body.
+        asin (str, optional): Product ASIN used in the snapshot name.
+        failed (bool): True if the page did not yield complete product details.
+
+    Returns:
+        Future: The pending write, or None if the page was not captured.
+    """
+    if not content or not should_capture(failed):
+        return None
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return _executor.submit(_write_snapshot, content, asin or "unknown", timestamp, failed)
+
+
+def _write_snapshot(content, asin, timestamp, failed):
+    try:
+        digest = hashlib.sha1(content).hexdigest()[:16]
+        with _lock:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+
+            # Content addressed: an identical page for the same ASIN is only stored once
+            if glob.glob(os.path.join(SNAPSHOT_DIR, f"{asin}_*_{digest}.html.gz")):
+                return None
+
+            status = "failed" if failed else "ok"
+            path = os.path.join(SNAPSHOT_DIR, f"{asin}_{timestamp}_{status}_{digest}.html.gz")
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            print(f"Saved debug snapshot: {path}")
+
+            _evict()
+            return path
+    except Exception as e:
+        print(f"Error saving debug snapshot: {e}")
+        return None
+
+
+def _evict():
+    snapshots = []
+    for path in glob.glob(os.path.join(SNAPSHOT_DIR, "*.html.gz")):
+        try:
+            stat = os.stat(path)
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            pass
+
+    total_bytes = sum(size for _, size, _ in snapshots)
+    for _, size, path in sorted(snapshots):
+        if total_bytes <= SNAPSHOT_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total_bytes -= size
+        except OSError:
+            pass
+
+
+def list_snapshots(asin=None):
+    """
+    List stored snapshots, newest first.
+
+    Args:
+        asin (str, optional): Only list snapshots of this ASIN.
+
+    Returns:
+        list: Snapshot file paths.
+    """
+    pattern = f"{asin}_*.html.gz" if asin else "*.html.gz"
+    return sorted(glob.glob(os.path.join(SNAPSHOT_DIR, pattern)), key=os.path.getmtime, reverse=True)
+
+
+def read_snapshot(path):
+    """
+    Args:
+        path (str): Snapshot file path.
+
+    Returns:
+        bytes: The decompressed page.
+    """
+    with gzip.open(path, 'rb') as f:
+        return f.read()
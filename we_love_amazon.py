@@ -1,13 +1,22 @@
-import pandas as pd
-import requests
 import os
 import time
-import json
-import random
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
-import re
+from urllib.parse import urlparse
 import pytz  # Added for timezone handling
+import batch_scraper
+import http_client
+import redirects
+import product_cache
+import page_parser
+import product_extractor
+import fast_extractor
+import snapshots
+import retry_policy
+import block_detector
+import link_quarantine
+import image_verifier
+from cursor_store import cursor_store
+import workbook_snapshot
 
 def get_product_details(affiliate_link, max_retries=3):
     """
@@ -38,411 +47,204 @@ def get_product_details(affiliate_link, max_retries=3):
         "Pragma": "no-cache"
     }
     
-    retry_count = 0
+    # Skip the network and parsing entirely if this product was scraped recently
+    cached_details = product_cache.get_cached_product_details(affiliate_link)
+    if cached_details:
+        print(f"Using cached product details for: {affiliate_link}")
+        return cached_details
     
-    while retry_count < max_retries:
+    # Classifies each failure so dead links fail fast and throttling backs off properly
+    retry = retry_policy.Retry(max_attempts=max_retries)
+    # Why the last attempt failed, None when the link itself is not to blame
+    last_error = None
+    
+    while retry.attempts_left():
         try:
-            # Add random delay to mimic human behavior
-            time.sleep(random.uniform(1.5, 4))
-            
-            session = requests.Session()
+            session = http_client.new_session()
             
-            # First get the redirect URL without following
-            print(f"Fetching initial URL: {affiliate_link}")
-            initial_response = session.get(
-                affiliate_link, 
-                headers=headers, 
-                allow_redirects=False,
-                timeout=20
-            )
+            # Resolve the affiliate short link, skipping the hops if it is cached
+            final_url, from_cache = redirects.resolve_affiliate_link(session, affiliate_link, headers, max_redirects=7)
             
-            # Handle redirects manually to better track the path
-            final_url = affiliate_link
-            redirect_count = 0
-            max_redirects = 7
+            print(f"Final URL after redirects: {final_url}")
             
-            while (initial_response.status_code in [301, 302, 303, 307, 308]) and redirect_count < max_redirects:
-                redirect_url = initial_response.headers.get('Location')
-                if not redirect_url:
-                    break
-                    
-                print(f"Redirect #{redirect_count + 1}: {redirect_url}")
-                
-                # If it's a relative URL, make it absolute
-                if redirect_url.startswith('/'):
-                    parsed_url = requests.utils.urlparse(final_url)
-                    redirect_url = f"{parsed_url.scheme}://{parsed_url.netloc}{redirect_url}"
-                
-                final_url = redirect_url
-                redirect_count += 1
-                
-                # Small delay between redirects
-                time.sleep(random.uniform(0.8, 2.0))
-                
-                # Follow the redirect
-                try:
-                    initial_response = session.get(
-                        redirect_url,
-                        headers=headers,
-                        allow_redirects=False,
-                        timeout=20
-                    )
-                except requests.exceptions.RequestException as e:
-                    print(f"Error during redirect {redirect_count}: {e}")
-                    break
+            asin = product_cache.extract_asin(final_url)
+            cached_details = product_cache.product_cache.get(asin)
+            if cached_details:
+                print(f"Using cached product details for ASIN {asin}")
+                return cached_details
             
-            print(f"Final URL after redirects: {final_url}")
+            # Stop instead of burning retries while the host is serving captcha pages
+            page_host = urlparse(final_url).netloc
+            if not block_detector.allow(page_host):
+                last_error = None
+                break
             
-            # Now fetch the actual page
+            # Now fetch the actual page, within the batch's download cap for the product host
             print("Fetching final product page...")
-            response = session.get(
-                final_url, 
-                headers=headers,
-                timeout=25
-            )
+            with batch_scraper.host_slot(final_url):
+                response = session.get(
+                    final_url, 
+                    headers=headers,
+                    timeout=25,
+                    stream=fast_extractor.STREAM_PRODUCT_PAGE
+                )
+                if response.status_code == 200 and fast_extractor.STREAM_PRODUCT_PAGE:
+                    # Try the regex fast path on the raw body first, stopping the download
+                    # as soon as name, price and image have been seen
+                    fast_details, content = fast_extractor.stream_product_details(response)
+                else:
+                    content = response.content
             
             if response.status_code != 200:
                 print(f"Failed to fetch product page. Status code: {response.status_code}")
-                retry_count += 1
-                time.sleep(random.uniform(2, 5))
-                continue
-                
-            # Debug: Save HTML for troubleshooting image extraction issues
-            with open(f"amazon_response_debug.html", "w", encoding="utf-8") as f:
-                f.write(response.text)
-                
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Debug output to see what we're parsing
-            print(f"Page title: {soup.title.text if soup.title else 'No title found'}")
-            
-            # Extract product name (trying multiple possible selectors)
-            product_name = None
-            possible_name_selectors = [
-                soup.find("span", {"id": "productTitle"}),
-                soup.find("h1", {"id": "title"}),
-                soup.find("h1", {"class": "a-spacing-none"}),
-                soup.select_one("#productTitle"),
-                soup.select_one(".product-title-word-break"),
-                soup.select_one(".product-title"),
-                soup.select_one("h1.a-size-large"),
-                soup.select_one("h1")
-            ]
-            
-            for selector in possible_name_selectors:
-                if selector:
-                    product_name = selector.get_text(strip=True)
-                    if product_name:  # Ensure it's not empty
+                snapshots.capture(content, asin, failed=True)
+                block_reason = block_detector.detect_block_page(response.status_code, content)
+                if block_reason:
+                    last_error = None
+                    if block_detector.record_block(page_host, block_reason):
                         break
-                    
-            # If still no product name, try to find in JSON-LD
-            if not product_name or product_name == "Surprice Product with maximum discount":
-                json_ld_scripts = soup.find_all("script", {"type": "application/ld+json"})
-                for script in json_ld_scripts:
-                    try:
-                        data = json.loads(script.string)
-                        if isinstance(data, dict) and "name" in data:
-                            product_name = data["name"]
-                            break
-                        elif isinstance(data, list) and data and "name" in data[0]:
-                            product_name = data[0]["name"]
-                            break
-                    except:
-                        pass
-                    
-            product_name = product_name if product_name else "Unknown Product"
-
-            # Extract price (trying multiple selectors)
-            price = None
-            price_selectors = [
-                soup.find("span", {"class": "a-price-whole"}),
-                soup.find("span", {"id": "priceblock_ourprice"}),
-                soup.find("span", {"class": "a-offscreen"}),
-                soup.select_one(".a-price .a-offscreen"),
-                soup.select_one("#corePriceDisplay_desktop_feature_div .a-price-whole"),
-                soup.select_one("#corePrice_feature_div .a-price-whole"),
-                soup.select_one(".a-price"),
-                soup.select_one("#price"),
-                soup.select_one(".price"),
-                soup.select_one("#corePrice_desktop .a-offscreen")  # Added additional selector
-            ]
-            
-            for selector in price_selectors:
-                if selector:
-                    price_text = selector.get_text(strip=True)
-                    if price_text:  # Check that we have text
-                        price = price_text
+                    if not retry.wait(retry_policy.THROTTLED, response.headers.get("Retry-After")):
                         break
-                        
-            # If still no price, try to find in JSON-LD
-            if not price or price == "N/A":
-                json_ld_scripts = soup.find_all("script", {"type": "application/ld+json"})
-                for script in json_ld_scripts:
-                    try:
-                        data = json.loads(script.string)
-                        if isinstance(data, dict) and "offers" in data:
-                            if isinstance(data["offers"], dict) and "price" in data["offers"]:
-                                price = data["offers"]["price"]
-                            elif isinstance(data["offers"], list) and data["offers"] and "price" in data["offers"][0]:
-                                price = data["offers"][0]["price"]
-                        elif isinstance(data, list) and data and "offers" in data[0]:
-                            if isinstance(data[0]["offers"], dict) and "price" in data[0]["offers"]:
-                                price = data[0]["offers"]["price"]
-                            elif isinstance(data[0]["offers"], list) and data[0]["offers"] and "price" in data[0]["offers"][0]:
-                                price = data[0]["offers"][0]["price"]
-                    except:
-                        pass
-                        
-            price = price if price else "N/A"
+                    continue
+                outcome = retry_policy.classify_status(response.status_code)
+                # A target cached by an earlier attempt may be stale, resolve it again before giving up
+                if from_cache:
+                    redirects.forget_affiliate_link(affiliate_link)
+                    if outcome == retry_policy.PERMANENT:
+                        outcome = retry_policy.TRANSIENT
+                # Only a dead link counts against it, not a throttled or failing host
+                last_error = f"HTTP {response.status_code}" if outcome == retry_policy.PERMANENT else None
+                if not retry.wait(outcome, response.headers.get("Retry-After")):
+                    break
+                continue
 
-            # IMPROVED HIGH-RESOLUTION IMAGE EXTRACTION
-            # We'll prioritize the highest resolution images available
-            image_url = None
-            hd_image_found = False
-            
-            # Function to check if an image URL is likely high-resolution
-            def is_high_res(url):
-                if not url:
-                    return False
-                # Check for typical high-res indicators in the URL
-                high_res_indicators = ['_SL1500_', '_SL1200_', '_SL1000_', '_SX1500_', '_UL1500_', 
-                                      'large', 'hiRes', 'hires', 'XXL', 'high', 'original']
-                return any(indicator in url for indicator in high_res_indicators)
-            
-            # Function to clean up Amazon image URLs to get highest resolution
-            def optimize_amazon_image_url(url):
-                if not url:
-                    return None
-                    
-                # Remove size constraints from URL to get highest resolution
-                # Pattern 1: Remove _SX... _SY... parameters
-                url = re.sub(r'_(SX|SY|UX|UY|AA|AB|AC|AD)\d+_', '_', url)
+            # The product page loaded, so the redirect target is worth caching
+            if not from_cache:
+                redirects.remember_affiliate_link(affiliate_link, final_url)
                 
-                # Pattern 2: Replace small/medium size indicators with large
-                url = url.replace('_SR75,75_', '_SL1500_')
-                url = url.replace('_SR140,140_', '_SL1500_')
-                url = url.replace('_SR200,200_', '_SL1500_')
-                url = url.replace('_SL160_', '_SL1500_')
-                url = url.replace('_SL500_', '_SL1500_')
+            # Try the regex fast path on the raw body first, only building a DOM if it misses a field
+            if not fast_extractor.STREAM_PRODUCT_PAGE:
+                page_encoding, _ = page_parser.sniff_encoding(content, response.headers.get("Content-Type"))
+                fast_details = fast_extractor.extract_product_details(content, page_encoding)
                 
-                # Pattern 3: Handle URLs with ?_encoding=... parameters
-                if '?' in url:
-                    url = url.split('?')[0]
+            # A captcha or robot-check page has no product details, don't parse it
+            if not fast_details:
+                block_reason = block_detector.detect_block_page(response.status_code, content)
+                if block_reason:
+                    last_error = None
+                    snapshots.capture(content, asin, failed=True)
+                    if block_detector.record_block(page_host, block_reason):
+                        break
+                    if not retry.wait(retry_policy.THROTTLED, response.headers.get("Retry-After")):
+                        break
+                    continue
+            block_detector.record_success(page_host)
                 
-                return url
-            
-            # 1. First try to extract from image detail scripts which often have multiple resolutions
-            print("Searching for high-resolution images in scripts...")
-            script_tags = soup.find_all("script", {"type": "text/javascript"})
-            for script in script_tags:
-                script_text = script.string if script.string else ""
+            if fast_details:
+                product_name, price, image_candidates = fast_details
+                image_url = image_candidates[0]
+            else:
+                dom_started = time.perf_counter()
+                # Decode the body once from raw bytes instead of response.text's charset detection
+                page_text, _ = page_parser.decode_page(content, response.headers.get("Content-Type"))
+                soup = page_parser.make_soup(page_text)
                 
-                # Look for specific image data patterns
-                image_patterns = [
-                    (r'"hiRes":"(https://[^"]+)"', 'hiRes'),
-                    (r'"large":"(https://[^"]+)"', 'large'),
-                    (r'"mainImage":"(https://[^"]+)"', 'mainImage')
-                ]
+                # Debug output to see what we're parsing
+                print(f"Page title: {soup.title.text if soup.title else 'No title found'}")
                 
-                for pattern, img_type in image_patterns:
-                    matches = re.findall(pattern, script_text)
-                    if matches:
-                        for match in matches:
-                            candidate_url = match.replace('\\', '')
-                            if is_high_res(candidate_url):
-                                image_url = optimize_amazon_image_url(candidate_url)
-                                print(f"Found high-resolution {img_type} image: {image_url}")
-                                hd_image_found = True
-                                break
-                    if hd_image_found:
-                        break
+                # Extract name, price and the ranked image candidates from a single pass over the page
+                product_name, price, image_candidates = product_extractor.extract_product_candidates(soup)
+                image_url = image_candidates[0] if image_candidates else None
+                fast_extractor.stats.record_dom(time.perf_counter() - dom_started)
                 
-                # Alternative approach: Look for image JSON data
-                if not hd_image_found and "'colorImages'" in script_text:
-                    try:
-                        start_idx = script_text.find("'colorImages'") + len("'colorImages'") + 1
-                        end_idx = script_text.find("'colorToAsin'")
-                        if end_idx == -1:
-                            end_idx = script_text.find("'heroImage'")
-                        if end_idx == -1:
-                            end_idx = start_idx + 2000
-                        
-                        image_data = script_text[start_idx:end_idx].strip()
-                        
-                        # Search for high-resolution image URLs
-                        hiRes_match = re.search(r'"hiRes":"(https://[^"]+)"', image_data)
-                        large_match = re.search(r'"large":"(https://[^"]+)"', image_data)
-                        
-                        if hiRes_match:
-                            image_url = optimize_amazon_image_url(hiRes_match.group(1).replace('\\', ''))
-                            print(f"Found hiRes image in colorImages: {image_url}")
-                            hd_image_found = True
-                        elif large_match:
-                            image_url = optimize_amazon_image_url(large_match.group(1).replace('\\', ''))
-                            print(f"Found large image in colorImages: {image_url}")
-                            hd_image_found = True
-                    except Exception as e:
-                        print(f"Error parsing image data from script: {e}")
-            
-            # 2. Try to extract from data-zoom-hires attribute which typically has high-res images
-            if not hd_image_found:
-                print("Searching for data-zoom-hires attributes...")
-                zoom_images = soup.select("[data-zoom-hires]")
-                for img in zoom_images:
-                    zoom_url = img.get('data-zoom-hires')
-                    if zoom_url:
-                        image_url = optimize_amazon_image_url(zoom_url)
-                        print(f"Found high-resolution zoom image: {image_url}")
-                        hd_image_found = True
-                        break
-            
-            # 3. Try to extract from data-old-hires attribute
-            if not hd_image_found:
-                print("Searching for data-old-hires attributes...")
-                old_hires_images = soup.select("[data-old-hires]")
-                for img in old_hires_images:
-                    hires_url = img.get('data-old-hires')
-                    if hires_url:
-                        image_url = optimize_amazon_image_url(hires_url)
-                        print(f"Found high-resolution old-hires image: {image_url}")
-                        hd_image_found = True
-                        break
-            
-            # 4. Try to extract from data-a-dynamic-image which contains multiple resolutions
-            if not hd_image_found:
-                print("Searching for data-a-dynamic-image attributes...")
-                dynamic_images = soup.select("[data-a-dynamic-image]")
-                for img in dynamic_images:
-                    dynamic_attr = img.get('data-a-dynamic-image')
-                    if dynamic_attr and dynamic_attr.startswith('{'):
-                        try:
-                            image_dict = json.loads(dynamic_attr)
-                            # Get the URL with the highest resolution by comparing dimensions
-                            best_url = None
-                            best_size = 0
-                            for url, dimensions in image_dict.items():
-                                if isinstance(dimensions, list) and len(dimensions) >= 2:
-                                    size = dimensions[0] * dimensions[1]  # width * height
-                                    if size > best_size:
-                                        best_size = size
-                                        best_url = url
-                            
-                            if best_url:
-                                image_url = optimize_amazon_image_url(best_url)
-                                print(f"Found highest resolution dynamic image: {image_url} ({best_size} pixels)")
-                                hd_image_found = True
-                        except Exception as e:
-                            print(f"Error parsing dynamic image data: {e}")
-            
-            # 5. Try to find in JSON-LD which sometimes contains high-res images
-            if not hd_image_found:
-                print("Searching for images in JSON-LD...")
-                json_ld_scripts = soup.find_all("script", {"type": "application/ld+json"})
-                for script in json_ld_scripts:
-                    try:
-                        data = json.loads(script.string)
-                        if isinstance(data, dict) and "image" in data:
-                            img_data = data["image"]
-                            if isinstance(img_data, str):
-                                image_url = optimize_amazon_image_url(img_data)
-                                print(f"Found image in JSON-LD: {image_url}")
-                                hd_image_found = True
-                            elif isinstance(img_data, list) and img_data:
-                                # Find the highest resolution image in the list
-                                for img in img_data:
-                                    if is_high_res(img):
-                                        image_url = optimize_amazon_image_url(img)
-                                        print(f"Found high-res image in JSON-LD list: {image_url}")
-                                        hd_image_found = True
-                                        break
-                                # If no high-res, use the first one
-                                if not hd_image_found:
-                                    image_url = optimize_amazon_image_url(img_data[0])
-                                    print(f"Using first image from JSON-LD list: {image_url}")
-                                    hd_image_found = True
-                            break
-                    except Exception as e:
-                        print(f"Error parsing JSON-LD: {e}")
-            
-            # 6. Fallback to standard image selectors if nothing found yet
-            if not hd_image_found:
-                print("Falling back to standard image selectors...")
-                image_selectors = [
-                    soup.find("img", {"id": "landingImage"}),
-                    soup.find("img", {"id": "imgBlkFront"}),
-                    soup.select_one("#main-image-container img"),
-                    soup.select_one("#imgTagWrapperId img"),
-                    soup.select_one("#imageBlock_feature_div img"),
-                    soup.select_one("#imageBlock img"),
-                    soup.select_one("#main-image"),
-                    soup.select_one(".a-dynamic-image"),
-                    soup.select_one("#product-image"),
-                    soup.select_one(".product-image img")
-                ]
+                # Release the tree before the image check
+                del soup
                 
-                for selector in image_selectors:
-                    if selector:
-                        for attr in ["src", "data-old-hires", "data-a-dynamic-image"]:
-                            if selector.get(attr):
-                                img_attr = selector[attr]
-                                if attr == "data-a-dynamic-image" and img_attr.startswith('{'):
-                                    try:
-                                        image_dict = json.loads(img_attr)
-                                        first_url = list(image_dict.keys())[0]
-                                        image_url = optimize_amazon_image_url(first_url)
-                                    except:
-                                        pass
-                                else:
-                                    image_url = optimize_amazon_image_url(img_attr)
-                                break
-                        if image_url:
-                            print(f"Found image using standard selector: {image_url}")
-                            break
-            
-            # Ensure the image URL is absolute
-            if image_url and not image_url.startswith('http'):
-                image_url = "https:" + image_url if image_url.startswith('//') else f"https://www.amazon.com{image_url}"
+            # Debug: keep failed pages (and a sample of good ones) for troubleshooting extraction issues
+            snapshots.capture(
+                content,
+                asin,
+                failed=product_name == "Unknown Product" or price == "N/A" or not image_url
+            )
                 
             # Debug info
             print(f"Found product: {product_name}")
             print(f"Found price: {price}")
             print(f"Found image URL: {image_url if image_url else 'No image found'}")
             if image_url:
-                print(f"Image appears to be high-resolution: {is_high_res(image_url)}")
+                print(f"Image appears to be high-resolution: {product_extractor.is_high_res(image_url)}")
 
-            # Verify image URL by making a request to check if it's valid
-            if image_url:
-                try:
-                    print(f"Verifying image URL: {image_url}")
-                    img_response = requests.head(image_url, timeout=10)
-                    if img_response.status_code != 200:
-                        print(f"WARNING: Image URL returned status code {img_response.status_code}")
-                    else:
-                        print(f"Image URL verified successfully!")
-                except Exception as e:
-                    print(f"WARNING: Error verifying image URL: {e}")
+            # Verify the best image candidates concurrently, keeping the best ranked one that loads.
+            # If none loads, keep the best candidate anyway.
+            verified_image_url, _ = image_verifier.verify_image_candidates(image_candidates)
+            if verified_image_url:
+                image_url = verified_image_url
+
+            # Fill in a missing name or image from the longer-lived static cache
+            if product_name == "Unknown Product" or not image_url:
+                cached_static = product_cache.product_cache.get_static(asin)
+                if cached_static:
+                    cached_name, cached_image_url = cached_static
+                    if product_name == "Unknown Product":
+                        product_name = cached_name
+                        print(f"Using cached product name: {product_name}")
+                    if not image_url:
+                        image_url = cached_image_url
+                        print(f"Using cached image URL: {image_url}")
 
             # If we have a good product name and either price or image, consider it successful
             if product_name != "Unknown Product" and (price != "N/A" or image_url):
+                product_cache.product_cache.set(asin, product_name, price, image_url)
+                link_quarantine.quarantine.record_success(affiliate_link)
                 return product_name, price, image_url
             
             print("Missing product details, will retry...")
-            retry_count += 1
-            time.sleep(random.uniform(3, 7))
+            last_error = "Missing product details"
+            retry.wait(retry_policy.TRANSIENT)
 
         except Exception as e:
-            print(f"Error extracting product details (attempt {retry_count+1}): {e}")
+            print(f"Error extracting product details (attempt {retry.attempt}): {e}")
             print(f"Exception details: {type(e).__name__}")
             import traceback
             traceback.print_exc()
-            retry_count += 1
-            time.sleep(random.uniform(3, 7))
+            outcome = retry_policy.classify_exception(e)
+            # Timeouts and connection errors say nothing about the link itself
+            last_error = f"{type(e).__name__}: {e}" if outcome == retry_policy.PERMANENT else None
+            retry.wait(outcome)
+    
+    # Keep a dead link or one without product details out of the rotation for a while,
+    # unless the last attempt failed because of the host or the network
+    if last_error:
+        link_quarantine.quarantine.record_failure(affiliate_link, last_error)
     
     # If we've exhausted all retries, return what we have even if incomplete
     return product_name if 'product_name' in locals() else "Unknown Product", \
            price if 'price' in locals() else "N/A", \
            image_url if 'image_url' in locals() and image_url else None
 
+def get_product_details_batch(affiliate_links, max_retries=3, max_workers=batch_scraper.DEFAULT_MAX_WORKERS,
+                              per_host_limit=batch_scraper.DEFAULT_PER_HOST_LIMIT):
+    """
+    Extract product details for many affiliate links concurrently.
+
+    Args:
+        affiliate_links (list): The products' affiliate links, e.g. from batch_scraper.read_affiliate_links.
+        max_retries (int): Maximum number of retries for each link.
+        max_workers (int): Number of links scraped at the same time.
+        per_host_limit (int): Maximum concurrent page downloads from the same host.
+
+    Returns:
+        generator: Yields (affiliate_link, details) as each link finishes, where
+        details is the value returned by get_product_details.
+    """
+    return batch_scraper.scrape_batch(
+        affiliate_links,
+        get_product_details,
+        max_workers=max_workers,
+        per_host_limit=per_host_limit,
+        max_retries=max_retries
+    )
+
 def post_to_facebook(page_id, access_token, message, image_url):
     """
     Post a message with an image to a Facebook page using the Graph API.
@@ -466,7 +268,7 @@ def post_to_facebook(page_id, access_token, message, image_url):
     
     try:
         print(f"Posting to Facebook with image URL: {image_url}")
-        response = requests.post(url, data=payload)
+        response = http_client.post(url, data=payload)
         result = response.json()
         print(f"Facebook API response: {result}")
         return result
@@ -478,55 +280,45 @@ def get_next_affiliate_link(file_path, index_file='.current_link_index'):
     """
     Read the next affiliate link from the Excel file using round-robin rotation.
     
+    Invalid rows are skipped through the snapshot's validity bitmap and
+    quarantined links are each checked at most once, so a call never reads a
+    row twice.
+    
     Args:
         file_path (str): Path to the Excel file.
-        index_file (str): File to store the current index position.
+        index_file (str): Name of the rotation cursor, shared by every script that uses it.
         
     Returns:
         str: The affiliate link or None if not found.
     """
     try:
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        if df.empty:
-            print("Excel file is empty.")
-            return None
-        
-        # Get the current index, or start from 0 if file doesn't exist
-        current_index = 0
-        try:
-            if os.path.exists(index_file):
-                with open(index_file, 'r') as f:
-                    current_index = int(f.read().strip())
-        except:
-            current_index = 0
-        
-        # Get the total number of links
-        total_links = len(df)
+        # Read the compiled snapshot of the Excel file, only rebuilt when the workbook changes
+        with workbook_snapshot.load_snapshot(file_path, columns=1, validator="url") as snapshot:
         
-        # Round-robin: Ensure index is in valid range
-        current_index = current_index % total_links
+            if not len(snapshot):
+                print("Excel file is empty.")
+                return None
         
-        # Get the link from the appropriate row
-        link = df.iloc[current_index, 0]  # Column A (index 0)
+            # Get the total number of links
+            total_links = len(snapshot)
         
-        print(f"Selected link #{current_index+1} out of {total_links} links (Excel row A{current_index+1})")
-        
-        # Update the index for next time (increment and save)
-        next_index = (current_index + 1) % total_links
-        with open(index_file, 'w') as f:
-            f.write(str(next_index))
+            for _ in range(snapshot.valid_count):
+                # Round-robin: Atomically claim the next valid index and advance the cursor past it,
+                # so overlapping runs never pick the same row
+                current_index = cursor_store.claim_next(index_file, total_links, snapshot.next_valid)
+            
+                # Get the link from the appropriate row
+                link = snapshot.row(current_index)[0].strip()  # Column A (index 0)
+            
+                print(f"Selected link #{current_index+1} out of {total_links} links (Excel row A{current_index+1})")
+            
+                # Skip links that recently failed to scrape, without touching the network
+                if not link_quarantine.quarantine.is_quarantined(link):
+                    return link
+                print(f"Link at row {current_index+1} is quarantined, skipping it.")
         
-        # Check if the link is valid
-        if isinstance(link, str) and link.strip():
-            return link.strip()
-        else:
-            print(f"Invalid or empty link in Excel file at row {current_index+1}.")
-            # Try next link if this one is invalid
-            with open(index_file, 'w') as f:
-                f.write(str(next_index))
-            return get_next_affiliate_link(file_path, index_file)  # Recursive call to get next valid link
+            print("No eligible link found in the Excel file.")
+            return None
 
     except Exception as e:
         print(f"Error reading Excel file: {e}")
@@ -553,7 +345,7 @@ def post_text_only_to_facebook(page_id, access_token, message):
     
     try:
         print("Posting text-only message to Facebook as fallback")
-        response = requests.post(url, data=payload)
+        response = http_client.post(url, data=payload)
         result = response.json()
         print(f"Facebook API response: {result}")
         return result
@@ -590,9 +382,6 @@ def main():
     if affiliate_link:
         print(f"Extracting details for: {affiliate_link}")
         
-        # Add a small delay to avoid rate limiting
-        time.sleep(random.uniform(2, 4))
-        
         # Get product details with internal retries
         product_details = get_product_details(affiliate_link, max_retries=MAX_RETRIES)
 
@@ -624,7 +413,6 @@ def main():
             
             # Try posting with image first if available
             if image_url:
-                time.sleep(random.uniform(1, 2))  # Small delay before API call
                 response = post_to_facebook(PAGE_ID, ACCESS_TOKEN, message, image_url)
 
                 if 'id' in response:
@@ -650,7 +438,6 @@ def main():
             
             # If posting with image failed or no image is available, try text-only post
             if not success:
-                time.sleep(random.uniform(1, 2))  # Small delay before retry
                 response = post_text_only_to_facebook(PAGE_ID, ACCESS_TOKEN, message)
                 
                 if 'id' in response:
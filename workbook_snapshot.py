@@ -0,0 +1,265 @@
+import os
+import json
+import struct
+import hashlib
+import tempfile
+import threading
+from array import array
+from urllib.parse import urlparse
+
+import numpy as np
+
+from cache import cache_path
+import row_sources
+
+# Compiled snapshots of the content workbooks, rebuilt only when a workbook changes
+WORKBOOK_SNAPSHOT_DIR = cache_path("workbooks")
+
+# magic, workbook mtime_ns, workbook size, workbook sha1, columns, row count, offset of the row index
+HEADER = struct.Struct("<4sQQ20sIIQ")
+MAGIC = b"WBS3"
+
+# Serializes checking and rebuilding, e.g. for the scheduler's jobs sharing fb.xlsx
+_lock = threading.Lock()
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _cell(value):
+    # Cells are normalized to text or None, anything else is unusable as a link or message
+    return value if isinstance(value, str) else None
+
+
+def is_text(value):
+    return isinstance(value, str) and bool(value.strip())
+
+
+def is_url(value):
+    if not is_text(value):
+        return False
+    parsed_url = urlparse(value.strip())
+    return parsed_url.scheme in ("http", "https") and bool(parsed_url.netloc)
+
+
+# Rules deciding whether a row can be used, applied to its first column
+ROW_VALIDATORS = {
+    "text": is_text,
+    "url": is_url,
+}
+
+
+def snapshot_path(workbook_path, columns, validator):
+    """
+    Args:
+        workbook_path (str): Path to the workbook.
+        columns (int): Number of leading columns kept.
+        validator (str): Name of the row validity rule, a key of ROW_VALIDATORS.
+
+    Returns:
+        str: Path of the workbook's compiled snapshot.
+    """
+    name_digest = hashlib.sha1(os.path.abspath(workbook_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(
+        WORKBOOK_SNAPSHOT_DIR,
+        f"{os.path.basename(workbook_path)}.{name_digest}.c{columns}.{validator}.snap"
+    )
+
+
+class WorkbookSnapshot:
+    """
+    Read-only view of a compiled workbook snapshot.
+
+    The file holds a fixed header, each row as a JSON array, an offset index
+    with one entry per row plus an end marker, and a bitmap of the rows that
+    passed validation. Reading a row costs one seek into the index and one into
+    the data, no matter how large the workbook is.
+
+    The snapshot keeps its file open until close() is called, use it as a
+    context manager.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Rows are read through the handle opened here, so a concurrent rebuild replacing the file is never mixed in
+        self._file = open(path, 'rb')
+        try:
+            magic, self.mtime_ns, self.size, self.sha1, self.columns, self.row_count, self.index_start = HEADER.unpack(
+                self._file.read(HEADER.size)
+            )
+            if magic != MAGIC:
+                raise ValueError(f"Not a workbook snapshot: {path}")
+        except Exception:
+            self._file.close()
+            raise
+        self._valid = None
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.row_count
+
+    def row(self, index):
+        """
+        Args:
+            index (int): Zero-based row index, not counting the header row.
+
+        Returns:
+            list: The row's first `columns` cells, each a string or None.
+        """
+        if not 0 <= index < self.row_count:
+            raise IndexError(index)
+        self._file.seek(self.index_start + index * 8)
+        start, end = struct.unpack("<QQ", self._file.read(16))
+        self._file.seek(start)
+        return json.loads(self._file.read(end - start).decode("utf-8"))
+
+    @property
+    def valid(self):
+        """
+        Returns:
+            numpy.ndarray: One bool per row, True if the row passed validation.
+        """
+        if self._valid is None:
+            self._file.seek(self.index_start + (self.row_count + 1) * 8)
+            bitmap = np.frombuffer(self._file.read((self.row_count + 7) // 8), dtype=np.uint8)
+            self._valid = np.unpackbits(bitmap, count=self.row_count).astype(bool)
+        return self._valid
+
+    @property
+    def valid_count(self):
+        return int(np.count_nonzero(self.valid))
+
+    def next_valid(self, position):
+        """
+        Find the first valid row at or after a position, wrapping around to the first row.
+
+        Args:
+            position (int): Zero-based row index to start from.
+
+        Returns:
+            int: Index of the row, or None if no row is valid.
+        """
+        valid = self.valid
+        following = np.flatnonzero(valid[position:])
+        if following.size:
+            index = position + int(following[0])
+        else:
+            preceding = np.flatnonzero(valid[:position])
+            if not preceding.size:
+                return None
+            index = int(preceding[0])
+
+        skipped = (index - position) % self.row_count
+        if skipped:
+            print(f"Skipped {skipped} invalid or empty row(s) after row {position+1}")
+        return index
+
+    def matches(self, stat):
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+def build_snapshot(workbook_path, columns, validator, sha1=None):
+    """
+    Compile a workbook into a snapshot file.
+
+    Rows are streamed from the workbook straight into the snapshot, so the
+    table is never held in memory; only the offset index is.
+
+    Args:
+        workbook_path (str): Path to the workbook, any format row_sources supports.
+        columns (int): Number of leading columns kept.
+        validator (str): Name of the row validity rule, a key of ROW_VALIDATORS.
+        sha1 (bytes, optional): The workbook's SHA-1, computed if not given.
+
+    Returns:
+        WorkbookSnapshot: The new snapshot.
+    """
+    stat = os.stat(workbook_path)
+    sha1 = sha1 or _file_sha1(workbook_path)
+
+    is_valid = ROW_VALIDATORS[validator]
+    path = snapshot_path(workbook_path, columns, validator)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temporary file per build, so concurrent builders never write into each other's file
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    offsets = array('Q', [HEADER.size])
+    # Validity is decided once here, so picking a row never has to look at the rows it skips
+    valid = array('B')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b"\0" * HEADER.size)
+            for values in row_sources.iter_rows(workbook_path, columns):
+                cells = [_cell(value) for value in values]
+                f.write(json.dumps(cells, ensure_ascii=False).encode("utf-8"))
+                offsets.append(f.tell())
+                valid.append(is_valid(cells[0]))
+
+            row_count = len(offsets) - 1
+            index_start = f.tell()
+            f.write(offsets.tobytes())
+            f.write(np.packbits(np.frombuffer(valid, dtype=np.uint8)).tobytes())
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, sha1, columns, row_count, index_start))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"Compiled {workbook_path} into a snapshot of {row_count} rows")
+    return WorkbookSnapshot(path)
+
+
+def _touch_snapshot(snapshot, stat):
+    # Same content under a new mtime, e.g. after a copy: only refresh the recorded file stat
+    with open(snapshot.path, 'r+b') as f:
+        f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, snapshot.sha1, snapshot.columns,
+                            snapshot.row_count, snapshot.index_start))
+    snapshot.mtime_ns, snapshot.size = stat.st_mtime_ns, stat.st_size
+    return snapshot
+
+
+def load_snapshot(workbook_path, columns=1, validator="text"):
+    """
+    Get the compiled snapshot of a workbook, rebuilding it if the workbook changed.
+
+    The workbook's mtime and size are checked first; its hash is only computed
+    when they differ, so an unchanged workbook is never read.
+
+    Args:
+        workbook_path (str): Path to the workbook.
+        columns (int): Number of leading columns kept.
+        validator (str): Name of the row validity rule, a key of ROW_VALIDATORS.
+
+    Returns:
+        WorkbookSnapshot: The up to date snapshot, to be closed by the caller.
+    """
+    with _lock:
+        stat = os.stat(workbook_path)
+        try:
+            snapshot = WorkbookSnapshot(snapshot_path(workbook_path, columns, validator))
+        except (OSError, ValueError, struct.error):
+            snapshot = None
+
+        if snapshot and snapshot.columns == columns:
+            if snapshot.matches(stat):
+                return snapshot
+            sha1 = _file_sha1(workbook_path)
+            if sha1 == snapshot.sha1:
+                return _touch_snapshot(snapshot, stat)
+            snapshot.close()
+            return build_snapshot(workbook_path, columns, validator, sha1)
+        if snapshot:
+            snapshot.close()
+        return build_snapshot(workbook_path, columns, validator)